@@ -0,0 +1,135 @@
+'''
+離線重播各平台的頁面快照，測量擷取邏輯的速度 (頁/秒、留言/秒)
+
+先錄製快照 (需要網路，只需做一次)：
+    RECORD_SNAPSHOTS=1 python dcard/scrapper/scrapper.py
+之後在沒有網路的機器上：
+    python common/benchmark_extractors.py --repeat 5
+'''
+import io
+import os
+import sys
+import csv
+import time
+import argparse
+import contextlib
+import importlib.util
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.replay import list_snapshots, make_replay_driver, SnapshotServer, file_url
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def _load_module(name, relative_path):
+    """
+    依路徑載入各平台的 scrapper.py (四個檔名相同，不能直接 import)
+    """
+    path = os.path.join(ROOT, relative_path)
+    folder = os.path.dirname(path)
+    sys.path.insert(0, folder)
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(folder)
+    return module
+
+
+# -------------------------------------------------
+# 各平台擷取函式：在已載入的快照頁上執行一次擷取，回傳抓到的留言數
+# -------------------------------------------------
+def _dcard_extractor(mode):
+    def extract(module, driver, url):
+        module.EXTRACTION_MODE = mode
+        module.read_search_cards(driver)
+        return len([c for c in module.read_comments(driver) if c])
+    return extract
+
+
+def _threads_extract(module, driver, url):
+    return len(module.parse_post(driver, url)["comments"])
+
+
+def _facebook_extract(module, driver, url):
+    module.driver = driver
+    module.reset_extraction_marks()
+    seen = set()
+    module.extract_comments(seen, csv.writer(io.StringIO()))
+    return len(seen)
+
+
+def _instagram_extract(module, driver, url):
+    module.driver = driver
+    module.csv_file = io.StringIO()
+    module.csv_writer = csv.writer(module.csv_file)
+    seen = set()
+    module.extract_comments(seen)
+    return len(seen)
+
+
+# 名稱 -> (快照資料夾, scrapper 路徑, 擷取函式)
+EXTRACTORS = {
+    "dcard": ("dcard", "dcard/scrapper/scrapper.py", _dcard_extractor("js")),
+    "dcard-webdriver": ("dcard", "dcard/scrapper/scrapper.py", _dcard_extractor("webdriver")),
+    "threads": ("threads", "threads/scrapper/scrapper.py", _threads_extract),
+    "facebook": ("facebook", "facebook/scrapper/scrapper.py", _facebook_extract),
+    "instagram": ("instagram", "instagram/scrapper/scrapper.py", _instagram_extract),
+}
+
+
+def benchmark(names, repeat=3, serve=False):
+    driver = make_replay_driver()
+    results = []
+    try:
+        with contextlib.ExitStack() as stack:
+            server = stack.enter_context(SnapshotServer()) if serve else None
+
+            for name in names:
+                folder, script, extract = EXTRACTORS[name]
+                snapshots = list_snapshots(folder)
+                if not snapshots:
+                    print(f"⚠️  {name}: 找不到快照，請先以 RECORD_SNAPSHOTS=1 執行爬蟲")
+                    continue
+
+                module = _load_module(f"{folder}_scrapper", script)
+                pages = 0
+                comments = 0
+                elapsed = 0.0
+
+                for path in snapshots:
+                    url = server.url_for(path) if server else file_url(path)
+                    driver.get(url)
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        # 擷取函式會大量 print，測速時不輸出
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            count = extract(module, driver, url)
+                        elapsed += time.perf_counter() - start
+                        pages += 1
+                        comments += count
+
+                results.append((name, len(snapshots), pages, comments, elapsed))
+                print(f"✔ {name}: {pages} 次擷取完成")
+    finally:
+        driver.quit()
+
+    print(f"\n{'平台':<16} | {'快照':>4} | {'頁數':>5} | {'留言':>7} | {'秒':>8} | {'頁/秒':>8} | {'留言/秒':>10}")
+    print("-" * 80)
+    for name, n_snapshots, pages, comments, elapsed in results:
+        pps = pages / elapsed if elapsed else 0.0
+        cps = comments / elapsed if elapsed else 0.0
+        print(f"{name:<16} | {n_snapshots:>4} | {pages:>5} | {comments:>7} | {elapsed:>8.2f} | {pps:>8.2f} | {cps:>10.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="離線重播頁面快照並測量各平台擷取速度")
+    parser.add_argument("--platforms", nargs="+", choices=list(EXTRACTORS), default=list(EXTRACTORS),
+                        help="要測試的擷取器 (預設: 全部)")
+    parser.add_argument("--repeat", type=int, default=3, help="每個快照重複擷取幾次 (預設: %(default)s)")
+    parser.add_argument("--serve", action="store_true", help="以本機靜態伺服器提供快照，而非 file:// 載入")
+    args = parser.parse_args()
+
+    benchmark(args.platforms, repeat=args.repeat, serve=args.serve)
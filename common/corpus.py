@@ -0,0 +1,285 @@
+'''四個平台共用的留言語料庫：把各平台的 *_comments_by_keyword.json 打包成一個欄式檔案，分析時以 mmap 載入
+
+檔案格式 (little-endian，各區段對齊 8 bytes)：
+    magic "TMCORPUS" | uint32 版本 | uint32 header 長度 | header (JSON)
+    offsets   uint64 x (N+1)   第 i 則留言為 data[offsets[i]:offsets[i+1]] (UTF-8)
+    platform  uint8  x N       平台代碼 (header["platforms"] 的索引)
+    keyword   uint16 x N       關鍵字代碼 (header["keywords"] 的索引)
+    data                       所有留言的 UTF-8 字串接在一起
+
+同一平台、同一關鍵字的留言是連續的一段，header["segments"] 記錄每一段的 [平台, 關鍵字, 起, 訖]，
+因此取出某個關鍵字的留言只是一段切片，不需要複製或解析
+
+用法：
+    python common/corpus.py build     # 重新打包 (分析腳本載入時若 JSON 較新也會自動重建)
+    python common/corpus.py stats     # 各平台/關鍵字留言數，以及與 json.load 的載入時間比較
+'''
+import os
+import json
+import mmap
+import time
+import struct
+import argparse
+from array import array
+from collections.abc import Sequence
+
+# ================= 設定區 =================
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PLATFORMS = ["dcard", "facebook", "instagram", "threads"]
+SOURCE_FILES = {p: os.path.join(ROOT, p, f"{p}_comments_by_keyword.json") for p in PLATFORMS}
+CORPUS_FILE = os.path.join(ROOT, "comments_corpus.bin")
+# =========================================
+
+MAGIC = b"TMCORPUS"
+VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+
+
+def _pad(n):
+    return (-n) % 8
+
+
+# =====================================================
+# 打包
+# =====================================================
+def build_corpus(output=CORPUS_FILE, sources=SOURCE_FILES):
+    """
+    讀取各平台的 {keyword: [comments]}，寫成欄式語料庫檔案，回傳總留言數
+    先寫到暫存檔再 os.replace，正在 mmap 舊檔案的程式不受影響
+    """
+    platforms = []
+    keywords = []
+    keyword_ids = {}
+    segments = []
+    offsets = array("Q", [0])
+    platform_codes = array("B")
+    keyword_codes = array("H")
+    chunks = []
+    size = 0
+
+    for platform, path in sources.items():
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        platform_id = len(platforms)
+        platforms.append(platform)
+        for keyword, comments in data.items():
+            if keyword not in keyword_ids:
+                keyword_ids[keyword] = len(keywords)
+                keywords.append(keyword)
+            keyword_id = keyword_ids[keyword]
+
+            start = len(offsets) - 1
+            for comment in comments:
+                encoded = str(comment).encode("utf-8")
+                chunks.append(encoded)
+                size += len(encoded)
+                offsets.append(size)
+            n = len(comments)
+            platform_codes.extend([platform_id] * n)
+            keyword_codes.extend([keyword_id] * n)
+            segments.append([platform_id, keyword_id, start, start + n])
+
+    rows = len(offsets) - 1
+    header = {"platforms": platforms, "keywords": keywords, "rows": rows, "segments": segments}
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * _pad(_PREFIX.size + len(header_bytes))
+
+    tmp = output + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for column in (offsets, platform_codes, keyword_codes):
+            raw = column.tobytes()
+            f.write(raw + b"\0" * _pad(len(raw)))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, output)
+    return rows
+
+
+def is_stale(path=CORPUS_FILE, sources=SOURCE_FILES):
+    """
+    語料庫不存在，或任何一個來源 JSON 比它新
+    """
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    return any(os.path.exists(src) and os.path.getmtime(src) > built for src in sources.values())
+
+
+# =====================================================
+# 載入
+# =====================================================
+class CommentColumn(Sequence):
+    """
+    某一段留言 (通常是一個平台的一個關鍵字) 的唯讀序列
+    索引時才從 mmap 解碼成 str；raw(i) 直接回傳 UTF-8 的 memoryview，不複製
+    """
+
+    def __init__(self, corpus, start, stop):
+        self._corpus = corpus
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return CommentColumn(self._corpus, self.start + start, self.start + max(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("comment index out of range")
+        return self._corpus.text(self.start + index)
+
+    def __iter__(self):
+        text = self._corpus.text
+        for i in range(self.start, self.stop):
+            yield text(i)
+
+    def raw(self, index):
+        return self._corpus.raw(self.start + index)
+
+    def __repr__(self):
+        return f"<CommentColumn rows {self.start}:{self.stop}>"
+
+
+class Corpus:
+    """
+    以 mmap 開啟語料庫；各欄位都是直接指向檔案內容的 memoryview
+        corpus = Corpus()
+        for keyword, comments in corpus.by_keyword("dcard").items(): ...
+    """
+
+    def __init__(self, path=CORPUS_FILE):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+
+        magic, version, header_len = _PREFIX.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是可讀取的語料庫檔案 (版本 {version})")
+        pos = _PREFIX.size
+        header = json.loads(bytes(buf[pos:pos + header_len]).decode("utf-8"))
+        pos += header_len
+
+        self.platforms = header["platforms"]
+        self.keywords = header["keywords"]
+        self.segments = header["segments"]
+        rows = header["rows"]
+
+        columns = []
+        for fmt, count, width in (("Q", rows + 1, 8), ("B", rows, 1), ("H", rows, 2)):
+            nbytes = count * width
+            columns.append(buf[pos:pos + nbytes].cast(fmt))
+            pos += nbytes + _pad(nbytes)
+        self.offsets, self.platform_codes, self.keyword_codes = columns
+        self.data = buf[pos:]
+
+    def __len__(self):
+        return len(self.platform_codes)
+
+    def raw(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def text(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def by_keyword(self, platform):
+        """
+        回傳 {keyword: CommentColumn}，順序與原本的 JSON 相同
+        """
+        if platform not in self.platforms:
+            raise KeyError(f"語料庫中沒有 {platform} 的資料")
+        platform_id = self.platforms.index(platform)
+        return {
+            self.keywords[keyword_id]: CommentColumn(self, start, stop)
+            for pid, keyword_id, start, stop in self.segments
+            if pid == platform_id
+        }
+
+    def comments(self, platform, keyword):
+        return self.by_keyword(platform)[keyword]
+
+    def close(self):
+        # 仍有 CommentColumn 或 memoryview 在使用時，mmap 無法關閉，交給程式結束時釋放
+        try:
+            for view in (self.offsets, self.platform_codes, self.keyword_codes, self.data):
+                view.release()
+            self._mm.close()
+        except (BufferError, ValueError):
+            return
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_opened = {}
+
+
+def open_corpus(path=CORPUS_FILE, rebuild=True):
+    """
+    開啟語料庫 (同一個程序內共用同一份 mmap)；rebuild=True 時來源 JSON 較新就先重建
+    """
+    path = os.path.abspath(path)
+    if rebuild and path == os.path.abspath(CORPUS_FILE) and is_stale(path):
+        print(f"🔄 來源 JSON 有更新，重新打包語料庫：{path}")
+        build_corpus(path)
+        _opened.pop(path, None)
+    if path not in _opened:
+        _opened[path] = Corpus(path)
+    return _opened[path]
+
+
+def load_comments_by_keyword(platform, path=CORPUS_FILE):
+    """
+    取代 json.load(<platform>_comments_by_keyword.json)：
+    回傳 {keyword: 留言序列}，可迭代、len()、索引與切片，用法與原本的 list 相同
+    """
+    corpus = open_corpus(path)
+    if platform not in corpus.platforms:
+        raise FileNotFoundError(f"語料庫中沒有 {platform} 的資料 (找不到 {SOURCE_FILES.get(platform)})")
+    return corpus.by_keyword(platform)
+
+
+def _stats():
+    start = time.perf_counter()
+    corpus = open_corpus()
+    loaded = {p: corpus.by_keyword(p) for p in corpus.platforms}
+    corpus_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for src in SOURCE_FILES.values():
+        if os.path.exists(src):
+            with open(src, "r", encoding="utf-8") as f:
+                json.load(f)
+    json_seconds = time.perf_counter() - start
+
+    print(f"語料庫：{corpus.path} ({os.path.getsize(corpus.path) / 1e6:.1f} MB, {len(corpus)} 則留言)")
+    for platform, columns in loaded.items():
+        print(f"  {platform}: " + ", ".join(f"{kw} {len(col)}" for kw, col in columns.items()))
+    print(f"載入時間：語料庫 {corpus_seconds * 1000:.1f} ms / json.load {json_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="打包 / 檢視四個平台共用的留言語料庫")
+    parser.add_argument("command", choices=["build", "stats"])
+    args = parser.parse_args()
+
+    if args.command == "build":
+        n = build_corpus()
+        print(f"✅ 已打包 {n} 則留言 → {CORPUS_FILE}")
+    else:
+        _stats()
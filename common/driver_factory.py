@@ -0,0 +1,114 @@
+'''四個平台爬蟲共用的瀏覽器建立函式：預設為無頭、不載入圖片/影音/字型與追蹤器的精簡設定'''
+import os
+import threading
+from selenium import webdriver
+
+# ================= 設定區 =================
+# 以 CDP Network.setBlockedURLs 擋下的資源 (支援 * 萬用字元)
+BLOCKED_URL_PATTERNS = [
+    # 圖片
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico", "*.bmp",
+    # 影音
+    "*.mp4", "*.webm", "*.m4s", "*.m3u8", "*.mp3", "*.ogg",
+    # 字型
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # 第三方追蹤 / 廣告
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*scorecardresearch.com*", "*hotjar.com*",
+    "*clarity.ms*", "*criteo.com*", "*adnxs.com*",
+]
+
+WINDOW_SIZE = "1280,2000"
+
+# --no-sandbox 會關閉 Chrome 的程序隔離，只在必要時使用：
+# 以 root 執行 (例如 Docker 容器) 時 Chrome 不加這個參數無法啟動，會自動加上；
+# 其他環境需要時設定環境變數 CHROME_NO_SANDBOX=1
+NO_SANDBOX = os.environ.get("CHROME_NO_SANDBOX") == "1"
+# =========================================
+
+_LEAN_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-notifications",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-background-networking",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--blink-settings=imagesEnabled=false",
+    "--autoplay-policy=user-gesture-required",
+]
+
+_LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.media_stream": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+}
+
+
+def block_resources(driver, patterns=None):
+    """
+    在目前分頁啟用資源封鎖；新開的分頁需要再呼叫一次
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns or BLOCKED_URL_PATTERNS})
+
+
+# undetected_chromedriver 建立 driver 時會修補並複製 chromedriver 執行檔，
+# 多個執行緒同時建立會互相覆寫 (檔案忙碌或損毀)，因此一次只建立一個
+_uc_lock = threading.Lock()
+
+
+def _running_as_root():
+    return hasattr(os, "geteuid") and os.geteuid() == 0
+
+
+def make_driver(headless=True, lean=True, undetected=False, language=None, extra_args=None, no_sandbox=None):
+    """
+    建立 Chrome driver
+    headless:   無頭模式；需要手動登入的平台 (Facebook / Instagram / Threads) 第一次登入時要設為 False
+    lean:       不載入圖片、影音、字型與第三方追蹤器，並關閉背景功能，降低每個 worker 的載入時間與記憶體
+    undetected: 使用 undetected_chromedriver (Dcard 需要，避免被 Cloudflare 擋下)
+    language:   瀏覽器介面語言，例如 "en" (Instagram 依英文按鈕文字找元素)
+    no_sandbox: 加上 --no-sandbox；None 時依 NO_SANDBOX 設定，或以 root 執行時自動加上
+    """
+    if undetected:
+        import undetected_chromedriver as uc
+        options = uc.ChromeOptions()
+    else:
+        options = webdriver.ChromeOptions()
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={WINDOW_SIZE}")
+    else:
+        options.add_argument("--start-maximized")
+
+    if language:
+        options.add_argument(f"--lang={language}")
+
+    if no_sandbox is None:
+        no_sandbox = NO_SANDBOX or _running_as_root()
+    if no_sandbox:
+        options.add_argument("--no-sandbox")
+
+    if lean:
+        for arg in _LEAN_ARGS:
+            options.add_argument(arg)
+        options.add_experimental_option("prefs", _LEAN_PREFS)
+
+    for arg in extra_args or []:
+        options.add_argument(arg)
+
+    if undetected:
+        with _uc_lock:
+            driver = uc.Chrome(options=options)
+    else:
+        driver = webdriver.Chrome(options=options)
+
+    if lean:
+        block_resources(driver)
+    return driver
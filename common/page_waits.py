@@ -0,0 +1,225 @@
+'''爬蟲共用的等待函式：以 DOM 與網路都閒置為條件取代固定 sleep (dcard / facebook 共用)'''
+import time
+import threading
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# ================= 設定區 =================
+WAIT_TIMEOUT = 8          # 單次等待最長秒數，超過就當作頁面不會再變化
+POLL_INTERVAL = 0.1       # 檢查條件的間隔秒數
+DOM_QUIET_MS = 600        # DOM 多久沒有變動視為穩定
+NETWORK_QUIET_MS = 500    # 多久沒有新的網路請求視為閒置
+# =========================================
+
+# 在頁面中掛一個 MutationObserver，記錄最後一次 DOM 變動的時間；
+# 同時包裝 fetch / XMLHttpRequest 計算進行中的請求數 (resource timing 只看得到已完成的請求)，
+# 並放大 resource timing 的緩衝區 (預設 250 筆，滿了之後就不會再記錄新的請求)
+# 同一頁重複注入時不會重複掛載
+_INSTALL_OBSERVER_JS = """
+if (!window.__pageWaitObserver) {
+    window.__pageWaitLastMutation = performance.now();
+    window.__pageWaitObserver = new MutationObserver(function () {
+        window.__pageWaitLastMutation = performance.now();
+    });
+    window.__pageWaitObserver.observe(document, {childList: true, subtree: true});
+
+    window.__pageWaitPending = 0;
+    window.__pageWaitLastRequestEnd = 0;
+    var requestDone = function () {
+        window.__pageWaitPending = Math.max(0, window.__pageWaitPending - 1);
+        window.__pageWaitLastRequestEnd = performance.now();
+    };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            window.__pageWaitPending++;
+            var request = originalFetch.apply(this, arguments);
+            request.then(requestDone, requestDone);
+            return request;
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__pageWaitPending++;
+        this.addEventListener('loadend', requestDone);
+        return originalSend.apply(this, arguments);
+    };
+    if (performance.setResourceTimingBufferSize) performance.setResourceTimingBufferSize(100000);
+}
+"""
+
+# 等待開始時記下頁面時間，之後的「閒置」都從這個時間點起算，
+# 避免捲動前就已經閒置的頁面被誤判為已到底
+_MARK_JS = _INSTALL_OBSERVER_JS + "return performance.now();"
+
+# 捲到底並回傳 [頁面高度, arguments[0] 的元素數量]
+_SCROLL_JS = """
+window.scrollTo(0, document.body.scrollHeight);
+var countXpath = arguments[0];
+return [document.body.scrollHeight,
+        countXpath ? document.evaluate('count(' + countXpath + ')', document, null,
+                                       XPathResult.NUMBER_TYPE, null).numberValue : 0];
+"""
+
+# 一次取回判斷所需的所有資訊，避免多次 WebDriver 來回
+_PAGE_STATE_JS = _INSTALL_OBSERVER_JS + """
+var since = arguments[0], countXpath = arguments[1];
+var entries = performance.getEntriesByType('resource');
+var lastResponse = Math.max(since, window.__pageWaitLastRequestEnd);
+for (var i = 0; i < entries.length; i++) {
+    if (entries[i].responseEnd > lastResponse) lastResponse = entries[i].responseEnd;
+}
+var now = performance.now();
+return {
+    ready: document.readyState,
+    height: document.body ? document.body.scrollHeight : 0,
+    count: countXpath ? document.evaluate('count(' + countXpath + ')', document, null,
+                                          XPathResult.NUMBER_TYPE, null).numberValue : 0,
+    domQuietMs: now - Math.max(window.__pageWaitLastMutation, since),
+    networkQuietMs: now - lastResponse,
+    pending: window.__pageWaitPending
+};
+"""
+
+
+class WaitStats:
+    """
+    統計每一類等待實際花了多少時間，並與原本固定 sleep 的秒數比較
+    baseline: 原本固定 sleep 的平均秒數 (例如 random.uniform(1.5, 2.5) -> 2.0)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, elapsed, baseline, timed_out):
+        with self._lock:
+            s = self._stats.setdefault(name, {"count": 0, "elapsed": 0.0, "baseline": 0.0, "timeouts": 0})
+            s["count"] += 1
+            s["elapsed"] += elapsed
+            s["baseline"] += baseline
+            if timed_out:
+                s["timeouts"] += 1
+
+    def print_summary(self):
+        with self._lock:
+            stats = {k: dict(v) for k, v in self._stats.items()}
+        if not stats:
+            return
+
+        print("\n⏱️  等待時間統計：")
+        print(f"   {'等待類型':<16} | {'次數':>6} | {'平均(秒)':>8} | {'原本(秒)':>8} | {'逾時':>4} | {'省下(秒)':>8}")
+        total_saved = 0.0
+        for name, s in stats.items():
+            saved = s["baseline"] - s["elapsed"]
+            total_saved += saved
+            print(f"   {name:<16} | {s['count']:>6} | {s['elapsed'] / s['count']:>8.2f} | "
+                  f"{s['baseline'] / s['count']:>8.2f} | {s['timeouts']:>4} | {saved:>8.1f}")
+        print(f"   總共省下約 {total_saved:.1f} 秒")
+
+
+# 全域統計，多個 worker 共用
+wait_stats = WaitStats()
+
+
+def _mark(driver):
+    try:
+        return driver.execute_script(_MARK_JS)
+    except WebDriverException:
+        return 0
+
+
+def _is_quiet(state):
+    """
+    沒有進行中的請求，且 DOM 與網路都已閒置一段時間
+    """
+    return (state["pending"] == 0 and state["domQuietMs"] >= DOM_QUIET_MS
+            and state["networkQuietMs"] >= NETWORK_QUIET_MS)
+
+
+def _timed_wait(driver, name, baseline, condition, timeout):
+    """
+    用 WebDriverWait 輪詢 condition，條件成立立即返回；逾時不丟例外，只記錄在統計中
+    """
+    start = time.monotonic()
+    timed_out = False
+    result = None
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL,
+                               ignored_exceptions=(WebDriverException,)).until(condition)
+    except TimeoutException:
+        timed_out = True
+    wait_stats.record(name, time.monotonic() - start, baseline, timed_out)
+    return result
+
+
+def mark_page(driver):
+    """
+    記下目前的頁面時間 (同時掛上 MutationObserver)，之後 wait_for_quiet 的閒置從這個時間點起算
+    在觸發動作 (點擊、捲動) 之前呼叫
+    """
+    return _mark(driver)
+
+
+def wait_for_quiet(driver, since, name="quiet", baseline=0.0, timeout=WAIT_TIMEOUT):
+    """
+    等到 since 之後 DOM 與網路都閒置一段時間；逾時回傳 False，不丟例外
+    """
+    def condition(d):
+        return _is_quiet(d.execute_script(_PAGE_STATE_JS, since, None))
+
+    return bool(_timed_wait(driver, name, baseline, condition, timeout))
+
+
+def wait_for_page_ready(driver, ready_xpath=None, baseline=3.0, timeout=WAIT_TIMEOUT):
+    """
+    driver.get 之後使用：document 載入完成、(可選) 目標元素出現，且 DOM 與網路都已閒置
+    取代原本的 time.sleep(random.uniform(2, 4))
+    """
+    since = _mark(driver)
+
+    def condition(d):
+        state = d.execute_script(_PAGE_STATE_JS, since, ready_xpath)
+        if state["ready"] != "complete":
+            return False
+        if ready_xpath and state["count"] == 0:
+            return False
+        return _is_quiet(state)
+
+    return _timed_wait(driver, "page_load", baseline, condition, timeout)
+
+
+def scroll_to_bottom(driver, count_xpath=None):
+    """
+    捲到頁面底部，回傳捲動當下的 (頁面高度, count_xpath 的元素數量)
+    與 wait_for_more_content 的 previous_height / previous_count 使用同一個計數方式
+    """
+    return driver.execute_script(_SCROLL_JS, count_xpath)
+
+
+def wait_for_more_content(driver, previous_height, count_xpath=None, previous_count=0,
+                          name="scroll", baseline=2.0, timeout=WAIT_TIMEOUT, since=None):
+    """
+    捲動之後使用：只要頁面變高或 count_xpath 的元素數量增加就立即返回；
+    若沒有進行中的請求、DOM 與網路都閒置了仍沒有新內容，也提早返回 (可能已經到底)
+    取代原本的 time.sleep(random.uniform(1.5, 2.5))
+    since: 捲動前以 mark_page 記下的時間；沒有給時從現在起算
+
+    回傳 (new_height, new_count)
+    """
+    if since is None:
+        since = _mark(driver)
+    last_state = {}
+
+    def condition(d):
+        state = d.execute_script(_PAGE_STATE_JS, since, count_xpath)
+        last_state.update(state)
+        if state["height"] > previous_height:
+            return True
+        if count_xpath and state["count"] > previous_count:
+            return True
+        return _is_quiet(state)
+
+    _timed_wait(driver, name, baseline, condition, timeout)
+    return last_state.get("height", previous_height), last_state.get("count", previous_count)
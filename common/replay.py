@@ -0,0 +1,101 @@
+'''錄製 / 重播爬蟲頁面快照，讓擷取邏輯可以在沒有網路的環境下執行與測速'''
+import os
+import re
+import time
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from common.driver_factory import make_driver
+
+# ================= 設定區 =================
+# 設定環境變數 RECORD_SNAPSHOTS=1 後執行各平台爬蟲，就會把擷取前的頁面存成快照
+RECORD_SNAPSHOTS = os.environ.get("RECORD_SNAPSHOTS") == "1"
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+# =========================================
+
+# 取得目前 DOM 的 HTML，並移除 <script>，重播時頁面不會再執行網站的 JS 或發出請求
+_SNAPSHOT_JS = """
+var root = document.documentElement.cloneNode(true);
+var scripts = root.querySelectorAll('script, noscript, iframe');
+for (var i = 0; i < scripts.length; i++) scripts[i].remove();
+var marked = root.querySelectorAll('[data-scraped]');
+for (var i = 0; i < marked.length; i++) marked[i].removeAttribute('data-scraped');
+return '<!DOCTYPE html>\\n' + root.outerHTML;
+"""
+
+
+def _safe_name(name):
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", name).strip("_") or "page"
+
+
+def save_snapshot(driver, platform, name, force=False):
+    """
+    把目前頁面存到 snapshots/<platform>/<name>_<時間>.html
+    RECORD_SNAPSHOTS 未開啟時不做任何事 (force=True 可強制儲存)
+    """
+    if not (RECORD_SNAPSHOTS or force):
+        return None
+
+    try:
+        html = driver.execute_script(_SNAPSHOT_JS)
+    except Exception:
+        html = driver.page_source
+
+    folder = os.path.join(SNAPSHOT_DIR, platform)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{_safe_name(name)}_{time.strftime('%Y%m%d_%H%M%S')}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"📸 已儲存頁面快照：{path}")
+    return path
+
+
+def list_snapshots(platform):
+    folder = os.path.join(SNAPSHOT_DIR, platform)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".html"))
+
+
+def make_replay_driver():
+    """
+    重播用的無頭 Chrome，不需要登入也不需要網路
+    """
+    return make_driver(headless=True, lean=True)
+
+
+class SnapshotServer:
+    """
+    以本機靜態伺服器提供 snapshots/ 目錄 (有些頁面用 file:// 載入時行為不同)
+    用法：
+        with SnapshotServer() as server:
+            driver.get(server.url_for(path))
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, port=0):
+        self.directory = directory
+        handler = functools.partial(_QuietHandler, directory=directory)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def url_for(self, path):
+        rel = os.path.relpath(path, self.directory).replace(os.sep, "/")
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/{rel}"
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def file_url(path):
+    return "file:///" + os.path.abspath(path).replace(os.sep, "/").lstrip("/")
@@ -0,0 +1,125 @@
+'''比較不同推論後端與原本 pipeline("sentiment-analysis") 的結果是否一致，並量測速度
+
+以各平台已存在的 *_sentiment_by_keyword.json 為基準 (由原本的 full-precision 模型產生)：
+    python common/sentiment_agreement.py --backend int8
+    python common/sentiment_agreement.py --backend onnx --platforms dcard threads --limit 2000 --baseline
+'''
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.corpus import PLATFORMS
+from common.sentiment_engine import ROOT, BACKENDS, MODEL_NAME, text_hash, load_pipeline, classify_texts
+
+REFERENCE_FILES = {
+    p: os.path.join(ROOT, p, "sentiment_analysis", f"{p}_sentiment_by_keyword.json") for p in PLATFORMS
+}
+LABELS = ["正面", "中性", "負面"]
+
+
+def load_references(platforms, limit=None, seed=0):
+    """
+    讀取已存的情感分析結果，回傳不重複留言的 [(comment, sentiment, score), ...]
+    limit: 只取固定亂數種子抽樣的前 limit 則，方便在 CPU 上快速比較
+    """
+    items = {}
+    for platform in platforms:
+        path = REFERENCE_FILES[platform]
+        if not os.path.exists(path):
+            print(f"⚠️  找不到 {path}，略過 {platform}")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for results in data.values():
+            for item in results:
+                if item["sentiment"] in LABELS:
+                    items.setdefault(text_hash(item["comment"]), (item["comment"], item["sentiment"], item["score"]))
+
+    items = list(items.values())
+    if limit and len(items) > limit:
+        items = random.Random(seed).sample(items, limit)
+    return items
+
+
+def run_backend(backend, texts, device=-1):
+    sentiment_pipeline = load_pipeline(backend, device, MODEL_NAME)
+    # 先暖機一次，避免把載入 / 第一次編譯的時間算進去
+    classify_texts(texts[:8], sentiment_pipeline)
+    start = time.perf_counter()
+    predictions = classify_texts(texts, sentiment_pipeline)
+    return predictions, time.perf_counter() - start
+
+
+def agreement_report(references, predictions):
+    """
+    回傳 {"total", "agree", "rate", "confusion": {基準: {預測: 數量}}, "mean_score_diff"}
+    """
+    confusion = {ref: {} for ref in LABELS}
+    agree = 0
+    score_diffs = []
+    for (_, ref_label, ref_score), (label, score) in zip(references, predictions):
+        confusion[ref_label][label] = confusion[ref_label].get(label, 0) + 1
+        if label == ref_label:
+            agree += 1
+            score_diffs.append(abs(score - ref_score))
+    total = len(references)
+    return {
+        "total": total,
+        "agree": agree,
+        "rate": agree / total if total else 0.0,
+        "confusion": confusion,
+        "mean_score_diff": sum(score_diffs) / len(score_diffs) if score_diffs else 0.0,
+    }
+
+
+def print_report(backend, report, seconds, baseline_seconds=None):
+    total = report["total"]
+    print(f"\n後端：{backend}  (基準：已存的 pipeline(\"sentiment-analysis\") 結果)")
+    print(f"比較 {total} 則不重複留言，標籤一致 {report['agree']} 則 ({report['rate'] * 100:.2f}%)")
+    print(f"標籤一致時平均分數差：{report['mean_score_diff']:.4f}")
+
+    predicted = sorted({label for row in report["confusion"].values() for label in row}, key=lambda l: (l not in LABELS, l))
+    print(f"\n{'基準/預測':<10} | " + " | ".join(f"{label:>6}" for label in predicted))
+    print("-" * (13 + 9 * len(predicted)))
+    for ref, row in report["confusion"].items():
+        print(f"{ref:<10} | " + " | ".join(f"{row.get(label, 0):>6}" for label in predicted))
+
+    if seconds:
+        print(f"\n速度：{seconds:.1f} 秒 ({total / seconds:.1f} 則/秒)")
+    if baseline_seconds and seconds:
+        print(f"pytorch：{baseline_seconds:.1f} 秒 ({total / baseline_seconds:.1f} 則/秒)，"
+              f"加速 {baseline_seconds / seconds:.2f} 倍")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比較情感分析後端與已存結果的一致性與速度")
+    parser.add_argument("--backend", choices=BACKENDS, default="int8", help="要測試的後端 (預設: %(default)s)")
+    parser.add_argument("--platforms", nargs="+", choices=PLATFORMS, default=PLATFORMS,
+                        help="使用哪些平台的已存結果 (預設: 全部)")
+    parser.add_argument("--limit", type=int, default=None, help="最多比較幾則留言 (預設: 全部)")
+    parser.add_argument("--baseline", action="store_true", help="同時以 pytorch 後端在 CPU 上跑一次，比較速度")
+    parser.add_argument("--output", help="把報告另存成 JSON")
+    args = parser.parse_args()
+
+    references = load_references(args.platforms, args.limit)
+    texts = [comment for comment, _, _ in references]
+    print(f"載入 {len(texts)} 則不重複留言作為基準")
+
+    predictions, seconds = run_backend(args.backend, texts)
+    report = agreement_report(references, predictions)
+
+    baseline_seconds = None
+    if args.baseline and args.backend != "pytorch":
+        _, baseline_seconds = run_backend("pytorch", texts)
+
+    print_report(args.backend, report, seconds, baseline_seconds)
+
+    if args.output:
+        report.update({"backend": args.backend, "seconds": seconds, "baseline_seconds": baseline_seconds})
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"報告已儲存：{args.output}")
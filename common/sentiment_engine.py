@@ -0,0 +1,524 @@
+'''情感分析共用流程：dcard / threads 的 sentiment_analysis.py 共用同一套推論與快取
+
+快取以 (模型名稱, 正規化後留言的 hash) 為 key 存放標籤與分數，
+重新執行時只有快取中沒有的留言才會送進模型
+'''
+import os
+import re
+import time
+import shutil
+import sqlite3
+import tempfile
+import hashlib
+import unicodedata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+# ================= 設定區 =================
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+MODEL_NAME = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+CACHE_FILE = os.path.join(ROOT, "sentiment_cache.sqlite")
+# 推論後端：
+#   pytorch  原本的 full-precision 模型
+#   int8     torch 動態量化 (Linear 層轉成 int8)，只在 CPU 上執行
+#   onnx     匯出成 ONNX 並以 onnxruntime 執行 (需要 optimum[onnxruntime])，匯出結果存在 ONNX_DIR
+BACKENDS = ["pytorch", "int8", "onnx"]
+ONNX_DIR = os.path.join(ROOT, "onnx_models")
+BATCH_SIZE = 8           # 固定批次模式的每批則數 (原本的做法)
+MAX_LENGTH = 512
+# 動態批次：依 token 長度排序後分批，每批的「最長長度 x 則數」不超過 TOKEN_BUDGET
+DYNAMIC_BATCHING = True
+TOKEN_BUDGET = 4096
+MAX_BATCH_SIZE = 64
+CHUNK_SIZE = 256  # 每次送進模型的不重複留言數 (每塊推論完就寫入快取)
+# 多程序分片：WORKERS 個程序各自載入模型，每個程序的 torch 執行緒數固定為 THREADS_PER_WORKER
+WORKERS = 1
+THREADS_PER_WORKER = None  # None = CPU 核心數 / WORKERS
+# =========================================
+
+# Label mapping
+LABEL_MAP = {
+    "negative": "負面",
+    "neutral": "中性",
+    "positive": "正面",
+    "LABEL_0": "負面",
+    "LABEL_1": "中性",
+    "LABEL_2": "正面"
+}
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """
+    全形/半形統一 (NFKC)、去除頭尾空白、連續空白合併成一個
+    """
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", str(text))).strip()
+
+
+def text_hash(text):
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+def to_label(pred):
+    label = pred['label']
+    return LABEL_MAP.get(label, LABEL_MAP.get(str(label).lower(), label))
+
+
+# =====================================================
+# 模型載入
+# =====================================================
+def cache_model_key(backend="pytorch", model_name=MODEL_NAME):
+    """
+    快取中區分不同後端的結果 (量化後的分數會略有不同，不能混用)
+    """
+    return model_name if backend == "pytorch" else f"{model_name}@{backend}"
+
+
+def load_tokenizer(model_name=MODEL_NAME):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name, use_fast=False)
+
+
+def onnx_export_dir(model_name=MODEL_NAME):
+    return os.path.join(ONNX_DIR, model_name.replace("/", "__"))
+
+
+def export_onnx_model(model_name=MODEL_NAME):
+    """
+    把模型匯出成 ONNX (已匯出過就直接回傳路徑)
+    先匯出到暫存資料夾再 os.replace，匯出到一半中斷不會留下被當成完整的資料夾；
+    多程序推論時由主程序在建立 worker 前先呼叫一次，worker 只需要載入
+    """
+    export_dir = onnx_export_dir(model_name)
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        return export_dir
+    if os.path.isdir(export_dir):
+        # 舊版本直接寫入目標資料夾，中斷時會留下不完整的匯出
+        print(f"⚠️  {export_dir} 的匯出不完整，重新匯出")
+        shutil.rmtree(export_dir)
+
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    print(f"匯出 ONNX 模型到 {export_dir}...")
+    os.makedirs(ONNX_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".export_", dir=ONNX_DIR)
+    try:
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(tmp_dir)
+        try:
+            os.replace(tmp_dir, export_dir)
+        except OSError:
+            # 另一個程序已經先完成匯出
+            if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+                raise
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+    return export_dir
+
+
+def load_pipeline(backend="pytorch", device=-1, model_name=MODEL_NAME):
+    """
+    依後端建立 sentiment-analysis pipeline；int8 / onnx 一律在 CPU 上執行
+    """
+    from transformers import pipeline, AutoModelForSequenceClassification
+
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的後端 {backend}，可用：{', '.join(BACKENDS)}")
+    tokenizer = load_tokenizer(model_name)
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+
+        model = ORTModelForSequenceClassification.from_pretrained(export_onnx_model(model_name))
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    if backend == "int8":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+
+    # Move model to device
+    if device >= 0:
+        model = model.to(f'cuda:{device}')
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=device)
+
+
+# =====================================================
+# 持久化快取
+# =====================================================
+class SentimentCache:
+    """
+    SQLite 快取：(model, hash) -> (sentiment, score)
+    同一個檔案可存放多個模型 / 後端的結果，彼此不會混用
+    """
+
+    def __init__(self, path=CACHE_FILE, model=MODEL_NAME):
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, sentiment TEXT NOT NULL, score REAL NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+
+    def get_many(self, hashes):
+        """
+        回傳 {hash: (sentiment, score)}，只包含快取中有的項目
+        """
+        found = {}
+        hashes = list(dict.fromkeys(hashes))
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT hash, sentiment, score FROM sentiment WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                [self.model] + chunk,
+            )
+            for h, sentiment, score in rows:
+                found[h] = (sentiment, score)
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        items: [(hash, sentiment, score), ...]
+        """
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sentiment (model, hash, sentiment, score) VALUES (?, ?, ?, ?)",
+                [(self.model, h, sentiment, score) for h, sentiment, score in items],
+            )
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"快取命中 {self.hits} / {total} ({rate:.1f}%)，需推論 {self.misses} 則"
+
+    def close(self):
+        self._db.close()
+
+
+# =====================================================
+# 推論
+# =====================================================
+class BatchStats:
+    """
+    統計實際 token 數與補齊 (padding) 後的 token 數，觀察分批的效率
+    """
+
+    def __init__(self):
+        self.texts = 0
+        self.batches = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.seconds = 0.0
+
+    def merge(self, other):
+        self.texts += other.texts
+        self.batches += other.batches
+        self.tokens += other.tokens
+        self.padded_tokens += other.padded_tokens
+        self.seconds += other.seconds
+
+    def record(self, lengths, seconds):
+        self.texts += len(lengths)
+        self.batches += 1
+        self.tokens += sum(lengths)
+        self.padded_tokens += max(lengths) * len(lengths)
+        self.seconds += seconds
+
+    def summary(self):
+        if not self.texts:
+            return "沒有需要推論的留言"
+        efficiency = self.tokens / self.padded_tokens * 100 if self.padded_tokens else 100.0
+        speed = self.texts / self.seconds if self.seconds else 0.0
+        return (f"推論 {self.texts} 則 / {self.batches} 批，{self.seconds:.1f} 秒 ({speed:.1f} 則/秒)，"
+                f"padding 效率 {efficiency:.1f}%")
+
+
+def token_lengths(texts, sentiment_pipeline=None, tokenizer=None):
+    """
+    每則留言截斷後的 token 數 (含特殊 token)；沒有 tokenizer 時以字元數估計
+    """
+    tokenizer = tokenizer or getattr(sentiment_pipeline, "tokenizer", None)
+    if tokenizer is None:
+        return [min(len(t) + 2, MAX_LENGTH) for t in texts]
+    encoded = tokenizer(list(texts), truncation=True, max_length=MAX_LENGTH)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def plan_batches(lengths, token_budget=TOKEN_BUDGET, max_batch_size=MAX_BATCH_SIZE):
+    """
+    依長度由短到長排序後切成批次，回傳 [[原始索引, ...], ...]
+    一批補齊後的大小 (最長長度 x 則數) 不超過 token_budget，短留言可以一次多放幾則
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        # 排序後新加入的一定是這批最長的
+        if batch and (len(batch) >= max_batch_size or lengths[i] * (len(batch) + 1) > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _classify_batch(texts, sentiment_pipeline, batch_size):
+    """
+    整批推論失敗時改為逐則推論，單則失敗記為 ("Error", 0.0)
+    """
+    try:
+        # Process comments in batch
+        predictions = sentiment_pipeline(texts, truncation=True, max_length=MAX_LENGTH, batch_size=batch_size)
+        return [(to_label(pred), pred['score']) for pred in predictions]
+    except Exception as e:
+        print(f"Error processing batch of {len(texts)} comments: {e}")
+
+    # Fallback: process one by one
+    results = []
+    for text in texts:
+        try:
+            pred = sentiment_pipeline(text, truncation=True, max_length=MAX_LENGTH)[0]
+            results.append((to_label(pred), pred['score']))
+        except Exception:
+            results.append(("Error", 0.0))
+    return results
+
+
+def classify_texts(texts, sentiment_pipeline, lengths=None, dynamic=DYNAMIC_BATCHING, stats=None):
+    """
+    回傳與 texts 對應的 [(sentiment, score), ...]
+    dynamic=True 時依 token 長度分批 (結果仍依原本順序)；False 時依原順序每 BATCH_SIZE 則一批
+    stats: 有給 BatchStats 時記錄每批的 token 數與耗時
+    """
+    if not texts:
+        return []
+    if lengths is None:
+        lengths = token_lengths(texts, sentiment_pipeline)
+
+    if dynamic:
+        batches = plan_batches(lengths)
+    else:
+        batches = [list(range(i, min(i + BATCH_SIZE, len(texts)))) for i in range(0, len(texts), BATCH_SIZE)]
+
+    results = [None] * len(texts)
+    for batch in batches:
+        start = time.perf_counter()
+        predictions = _classify_batch([texts[i] for i in batch], sentiment_pipeline, len(batch))
+        if stats is not None:
+            stats.record([lengths[i] for i in batch], time.perf_counter() - start)
+        for i, result in zip(batch, predictions):
+            results[i] = result
+    return results
+
+
+# =====================================================
+# 多程序分片推論
+# =====================================================
+_worker_pipeline = None
+_worker_dynamic = DYNAMIC_BATCHING
+_worker_barrier = None
+WARM_UP_TIMEOUT = 600     # 暖機時等待所有程序都載入完模型的最長秒數
+
+
+def _init_worker(backend, threads, dynamic, model_name, barrier):
+    """
+    每個 worker 程序啟動時執行一次：固定 torch 執行緒數後載入自己的模型
+    (spawn 的子程序重新 import __main__ 時 torch 已經載入，設定 OMP_NUM_THREADS 已無效，只能用 set_num_threads)
+    """
+    global _worker_pipeline, _worker_dynamic, _worker_barrier
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    _worker_pipeline = load_pipeline(backend, -1, model_name)
+    _worker_dynamic = dynamic
+    _worker_barrier = barrier
+
+
+def _worker_warm_up(_):
+    """
+    推論一則暖機後在 barrier 等其他程序；每個程序都卡在這裡直到 workers 個都到齊，
+    因此同一個程序不會連續拿到兩個暖機工作
+    """
+    classify_texts(["warm up"], _worker_pipeline, dynamic=_worker_dynamic)
+    _worker_barrier.wait(WARM_UP_TIMEOUT)
+    return os.getpid()
+
+
+def _worker_classify(job):
+    texts, lengths = job
+    stats = BatchStats()
+    results = classify_texts(texts, _worker_pipeline, lengths=lengths, dynamic=_worker_dynamic, stats=stats)
+    return results, stats
+
+
+def threads_per_worker(workers, threads=None):
+    return threads or max(1, (os.cpu_count() or 1) // workers)
+
+
+def start_worker_pool(workers, threads=THREADS_PER_WORKER, dynamic=DYNAMIC_BATCHING, backend="pytorch",
+                      model_name=MODEL_NAME):
+    """
+    建立 workers 個推論程序，每個程序載入自己的模型 (在第一次送出工作時才啟動)
+    """
+    threads = threads_per_worker(workers, threads)
+    print(f"以 {workers} 個程序推論，每個程序 {threads} 個執行緒")
+    if backend == "onnx":
+        # 先在主程序匯出一次，避免每個 worker 同時匯出到同一個資料夾
+        export_onnx_model(model_name)
+    # spawn：每個 worker 從乾淨的狀態載入模型，避免 fork 之後 torch 執行緒池的問題
+    context = multiprocessing.get_context("spawn")
+    # 暖機用的 barrier 只能在建立程序時傳入 (無法隨工作送出)
+    barrier = context.Barrier(workers)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                               initargs=(backend, threads, dynamic, model_name, barrier))
+
+
+def warm_up_pool(executor, workers):
+    """
+    讓每個程序都啟動、載入模型並各推論一則；一次送出 workers 個暖機工作，
+    每個工作都在 barrier 等到 workers 個程序到齊才返回，所以每個程序剛好執行一個
+    回傳各程序的 pid
+    """
+    return list(executor.map(_worker_warm_up, range(workers)))
+
+
+def iter_chunk_results(jobs, sentiment_pipeline=None, dynamic=DYNAMIC_BATCHING, workers=WORKERS,
+                       threads=THREADS_PER_WORKER, backend="pytorch", model_name=MODEL_NAME,
+                       stats=None, executor=None):
+    """
+    jobs: [(texts, lengths), ...]，依 jobs 的順序 yield 每塊的推論結果
+    workers > 1 時各塊分給多個程序同時推論；結果依原順序合併，與單程序相同
+    executor: 已建立的程序池 (start_worker_pool)；沒有給時在這裡建立，用完即關閉
+    """
+    if not jobs:
+        return
+    if workers <= 1 and executor is None:
+        for texts, lengths in jobs:
+            yield classify_texts(texts, sentiment_pipeline, lengths=lengths, dynamic=dynamic, stats=stats)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = start_worker_pool(workers, threads, dynamic, backend, model_name)
+    try:
+        for results, chunk_stats in executor.map(_worker_classify, jobs):
+            if stats is not None:
+                stats.merge(chunk_stats)
+            yield results
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+# =====================================================
+# 全域去重複：整個語料庫相同的留言 (正規化後) 只推論一次
+# =====================================================
+class InferencePlan:
+    """
+    把 {keyword: [comments]} 收斂成不重複的文字清單，並記錄每個 (keyword, 位置) 對應到哪一則
+        plan.hashes[i] / plan.texts[i]   第 i 則不重複的留言 (texts 為第一次出現時的原文)
+        plan.occurrences[keyword]        該關鍵字每則留言對應的 i
+    """
+
+    def __init__(self, data):
+        self.hashes = []
+        self.texts = []
+        self.occurrences = {}
+        self.total = 0
+        index = {}
+
+        for keyword, comments in data.items():
+            ids = []
+            for comment in comments:
+                h = text_hash(comment)
+                i = index.get(h)
+                if i is None:
+                    i = index[h] = len(self.hashes)
+                    self.hashes.append(h)
+                    self.texts.append(comment)
+                ids.append(i)
+            self.occurrences[keyword] = ids
+            self.total += len(ids)
+
+    def summary(self):
+        unique = len(self.hashes)
+        saved = (1 - unique / self.total) * 100 if self.total else 0.0
+        return f"共 {self.total} 則留言，不重複 {unique} 則 (省下 {saved:.1f}% 推論)"
+
+    def scatter(self, data, predictions):
+        """
+        predictions[i] 為第 i 則不重複留言的 (sentiment, score)，
+        依原本的關鍵字與順序展開成 {keyword: [{comment, sentiment, score}, ...]}
+        """
+        results = {}
+        for keyword, comments in data.items():
+            results[keyword] = [
+                {"comment": comment, "sentiment": predictions[i][0], "score": predictions[i][1]}
+                for comment, i in zip(comments, self.occurrences[keyword])
+            ]
+        return results
+
+
+def analyze_corpus(data, sentiment_pipeline, cache=None, chunk_size=CHUNK_SIZE, progress=True,
+                   dynamic=DYNAMIC_BATCHING, workers=WORKERS, threads=THREADS_PER_WORKER,
+                   backend="pytorch", model_name=MODEL_NAME, stats=None, executor=None,
+                   tokenizer=None):
+    """
+    {keyword: [comments]} -> {keyword: [{comment, sentiment, score}, ...]}
+    先去重複、再查快取，只把沒看過的不重複留言分塊送進模型；每塊推論完就寫入快取，中斷後可接續
+    動態批次時先依 token 長度排序再分塊，同一塊內的留言長度相近
+    workers > 1 (或給了 executor) 時 sentiment_pipeline 可以是 None (模型只在各 worker 程序中載入)
+    stats: 要累計分批統計的 BatchStats；沒有給時每次呼叫各自統計
+    tokenizer: 沒有 sentiment_pipeline 時用來計算長度；沒有給時在這裡載入
+    """
+    if stats is None:
+        stats = BatchStats()
+    data = {keyword: list(comments) for keyword, comments in data.items()}
+    plan = InferencePlan(data)
+    print(plan.summary())
+
+    predictions = [None] * len(plan.hashes)
+    if cache is not None:
+        known = cache.get_many(plan.hashes)
+        for i, h in enumerate(plan.hashes):
+            if h in known:
+                predictions[i] = known[h]
+
+    todo = [i for i, p in enumerate(predictions) if p is None]
+    if todo and sentiment_pipeline is None and tokenizer is None:
+        tokenizer = load_tokenizer(model_name)
+    lengths = dict(zip(todo, token_lengths([plan.texts[i] for i in todo], sentiment_pipeline, tokenizer))) if todo else {}
+    if dynamic:
+        todo.sort(key=lambda i: lengths[i])
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    jobs = [([plan.texts[i] for i in chunk], [lengths[i] for i in chunk]) for chunk in chunks]
+    chunk_results = iter_chunk_results(jobs, sentiment_pipeline, dynamic, workers, threads, backend, model_name,
+                                       stats, executor)
+    for chunk, results in tqdm(zip(chunks, chunk_results), total=len(chunks), desc="inference",
+                               disable=not progress or not chunks):
+        for i, result in zip(chunk, results):
+            predictions[i] = result
+        if cache is not None:
+            cache.put_many([(plan.hashes[i], s, score) for i, (s, score) in zip(chunk, results) if s != "Error"])
+
+    if progress and todo:
+        print(stats.summary())
+    return plan.scatter(data, predictions)
@@ -0,0 +1,96 @@
+'''多程序分片推論的擴展性測試：以相同的留言樣本分別用 1 / 2 / 4 / 8 個 worker 推論，比較速度與結果是否一致
+
+    python common/sentiment_scaling.py --limit 2000
+    python common/sentiment_scaling.py --workers 1 2 4 --threads 2 --backend int8
+'''
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.corpus import PLATFORMS, load_comments_by_keyword
+from common.sentiment_engine import (BACKENDS, MODEL_NAME, InferencePlan, BatchStats, analyze_corpus, load_pipeline,
+                                     load_tokenizer, classify_texts, threads_per_worker, start_worker_pool, warm_up_pool)
+
+
+def load_sample(platforms, limit):
+    """
+    各平台留言合併去重複後取前 limit 則 (固定順序，每次測試相同)
+    """
+    data = {}
+    for platform in platforms:
+        for keyword, comments in load_comments_by_keyword(platform).items():
+            data[f"{platform}/{keyword}"] = comments
+    texts = InferencePlan(data).texts
+    return texts[:limit] if limit else texts
+
+
+def run(texts, workers, threads, backend):
+    """
+    回傳 (predictions, 載入秒數, 推論秒數)
+    載入 = 建立 pipeline / 程序池 (含主程序計算長度用的 tokenizer) 並各推論一則暖機；推論只計算暖機之後的時間，
+    因此不同 worker 數的推論時間可以直接比較
+    """
+    executor = None
+    sentiment_pipeline = None
+    tokenizer = None
+    start = time.perf_counter()
+    if workers <= 1:
+        import torch
+        torch.set_num_threads(threads)
+        sentiment_pipeline = load_pipeline(backend, -1, MODEL_NAME)
+        classify_texts(["warm up"], sentiment_pipeline)
+    else:
+        tokenizer = load_tokenizer(MODEL_NAME)
+        executor = start_worker_pool(workers, threads, backend=backend)
+        warm_up_pool(executor, workers)
+    load_seconds = time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        results = analyze_corpus({"sample": texts}, sentiment_pipeline, cache=None, progress=False,
+                                 workers=workers, threads=threads, backend=backend,
+                                 stats=BatchStats(), executor=executor, tokenizer=tokenizer)["sample"]
+        infer_seconds = time.perf_counter() - start
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return [(r["sentiment"], r["score"]) for r in results], load_seconds, infer_seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="測試不同 worker 數的情感分析推論速度")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="要測試的 worker 數 (預設: %(default)s)")
+    parser.add_argument("--threads", type=int, default=None, help="每個 worker 的執行緒數 (預設: CPU 核心數 / worker 數)")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch", help="推論後端 (預設: %(default)s)")
+    parser.add_argument("--platforms", nargs="+", choices=PLATFORMS, default=PLATFORMS)
+    parser.add_argument("--limit", type=int, default=2000, help="測試留言數 (預設: %(default)s，0 = 全部)")
+    args = parser.parse_args()
+
+    texts = load_sample(args.platforms, args.limit)
+    print(f"測試 {len(texts)} 則不重複留言，CPU 核心數 {os.cpu_count()}")
+
+    rows = []
+    reference = None
+    for workers in args.workers:
+        threads = threads_per_worker(workers, args.threads)
+        predictions, load_seconds, seconds = run(texts, workers, threads, args.backend)
+
+        if reference is None:
+            reference = predictions
+        same = sum(a[0] == b[0] for a, b in zip(predictions, reference))
+        max_diff = max((abs(a[1] - b[1]) for a, b in zip(predictions, reference)), default=0.0)
+        rows.append((workers, threads, load_seconds, seconds, same, max_diff))
+        print(f"✔ {workers} worker x {threads} 執行緒：載入 {load_seconds:.1f} 秒，推論 {seconds:.1f} 秒")
+
+    # 加速與效率只以推論時間計算 (不含載入模型)
+    base = rows[0][3]
+    print(f"\n{'workers':>7} | {'threads':>7} | {'載入(秒)':>8} | {'推論(秒)':>8} | {'則/秒':>8} | {'加速':>6} | {'效率':>6} | "
+          f"{'標籤一致':>8} | {'最大分數差':>10}")
+    print("-" * 99)
+    for workers, threads, load_seconds, seconds, same, max_diff in rows:
+        speedup = base / seconds if seconds else 0.0
+        efficiency = speedup / (workers / rows[0][0]) * 100
+        print(f"{workers:>7} | {threads:>7} | {load_seconds:>8.1f} | {seconds:>8.1f} | {len(texts) / seconds:>8.1f} | "
+              f"{speedup:>5.2f}x | {efficiency:>5.0f}% | {same / len(texts) * 100:>7.1f}% | {max_diff:>10.2e}")
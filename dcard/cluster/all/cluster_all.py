@@ -14,6 +14,10 @@ import os
 import torch
 import re
 from sklearn.feature_extraction.text import CountVectorizer
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 
 
 # In[4]:
@@ -47,10 +51,9 @@ def clean_text(text):
 # Read data
 ##############
 
-input_file_name = "../../dcard_comments_by_keyword.json"
+input_file_name = CORPUS_FILE
 
-with open(input_file_name, "r", encoding="utf-8") as f:
-    comments_dict = json.load(f)
+comments_dict = load_comments_by_keyword("dcard")
 print(f"成功從{input_file_name}讀取檔案至comments_dict\n")
 
 # 將全部留言存到all_comments
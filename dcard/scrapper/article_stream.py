@@ -0,0 +1,138 @@
+import json
+import gzip
+import threading
+
+# 爬取結果的讀寫：
+#   .json      -> 原本的格式，整個陣列 json.dump (需全部留在記憶體)
+#   .jsonl     -> 每行一篇文章，邊爬邊寫，中途中斷也能直接使用已寫出的部分
+#   .jsonl.gz  -> 同上，gzip 壓縮
+OUTPUT_FORMATS = ["jsonl", "jsonl.gz", "json"]
+
+
+def open_text(path, mode="r"):
+    """
+    開啟文字檔，副檔名為 .gz 時自動使用 gzip
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def is_jsonl(path):
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+class ArticleWriter:
+    """
+    逐篇寫出文章
+    - JSON Lines：每篇文章立即寫入一行並 flush，不在記憶體中累積
+    - JSON：沿用原本格式，先暫存再於 close() 時一次寫出；
+            有給 order_key 時依 order_key 排序，讓平行爬取的輸出順序固定
+    同時統計各關鍵字的文章數
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.keyword_stats = {}
+        self._lock = threading.Lock()
+        self._buffer = None if is_jsonl(path) else []
+        self._file = open_text(path, "w")
+
+    def write(self, article, order_key=None):
+        with self._lock:
+            if self._buffer is None:
+                self._file.write(json.dumps(article, ensure_ascii=False) + "\n")
+                self._file.flush()
+            else:
+                self._buffer.append((order_key, self.count, article))
+            self.count += 1
+            kw = article["keyword"]
+            self.keyword_stats[kw] = self.keyword_stats.get(kw, 0) + 1
+
+    def close(self):
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.sort(key=lambda item: (item[0] is None, item[0] or (), item[1]))
+                json.dump([article for _, _, article in self._buffer], self._file, ensure_ascii=False, indent=4)
+                self._buffer = None
+            self._file.close()
+
+
+def iter_articles(path):
+    """
+    逐篇讀取爬取結果；JSON Lines 一次只讀一行，JSON 陣列逐一解析元素，
+    都不會把整個檔案載入記憶體
+    """
+    with open_text(path, "r") as f:
+        if is_jsonl(path):
+            line_no = 0
+            try:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        article = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 爬蟲仍在寫入或中途中斷時，最後一行可能不完整
+                        print(f"⚠️  {path} 第 {line_no} 行不完整，已略過")
+                        continue
+                    yield article
+            except EOFError:
+                # 當機留下的 .jsonl.gz 沒有 gzip 結尾，讀到最後會丟出 EOFError；已讀到的文章仍可使用
+                print(f"⚠️  {path} 在第 {line_no} 行之後被截斷，已略過其餘內容")
+        else:
+            yield from iter_json_array(f)
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    逐一解析 JSON 陣列中的元素，每次只讀入一個區塊，不需把整個陣列載入記憶體
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    while True:
+        chunk = f.read(chunk_size)
+        buf = (buf + chunk).lstrip()
+        if buf or not chunk:
+            break
+    if not buf.startswith("["):
+        raise ValueError("JSON 檔案的最外層不是陣列")
+    pos = 1
+    eof = False
+
+    while True:
+        # 略過空白與逗號
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+
+        if pos >= len(buf):
+            raise ValueError("JSON 陣列不完整")
+        if buf[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+            # 元素後面要接著 , 或 ]；停在區塊結尾或接著其他字元時 (例如數字被切斷) 元素可能還沒結束
+            rest = buf[end:end + 64].lstrip()
+            complete = eof or (rest[:1] in (",", "]") and rest != "")
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+
+        if not complete:
+            # 元素跨越區塊邊界：讀入下一個區塊後重試
+            more = f.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+
+        yield item
+        pos = end
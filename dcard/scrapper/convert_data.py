@@ -1,38 +1,103 @@
 import json
 import os
+import hashlib
+import argparse
+import tempfile
+
+from article_stream import iter_articles
+
+
+def comment_hash(comment):
+    return hashlib.md5(comment.encode('utf-8')).digest()[:8]
+
+
+def iter_merged_comments(input_files):
+    """
+    依序讀取多個爬取結果，yield (keyword, comment)
+    同一個關鍵字下的同一篇文章 (以 URL 判斷) 只保留一次：
+    之後的檔案若再出現同一篇 (例如增量爬取只輸出新留言)，只補上之前沒出現過的留言
+    """
+    seen_comments = {}  # (keyword, url) -> 該文章已輸出留言的 hash
+
+    for input_file in input_files:
+        print(f"Loading data from {input_file}...")
+        for item in iter_articles(input_file):
+            keyword = item.get('keyword')
+            comments = item.get('comments', [])
+            if not (keyword and comments):
+                continue
+
+            key = (keyword, item.get('url'))
+            if key[1] is None or key not in seen_comments:
+                if key[1] is not None:
+                    seen_comments[key] = {comment_hash(c) for c in comments}
+                for comment in comments:
+                    yield keyword, comment
+                continue
+
+            known = seen_comments[key]
+            for comment in comments:
+                h = comment_hash(comment)
+                if h not in known:
+                    known.add(h)
+                    yield keyword, comment
+
+
+def convert(input_files, output_file):
+    """
+    轉成 {keyword: [comments]}，輸出格式與 json.dump(..., indent=4) 相同
+    留言先依關鍵字暫存到各自的暫存檔，最後再依序串接，不需把所有留言放在記憶體
+    回傳 {keyword: 留言數}
+    """
+    counts = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spools = {}
+        try:
+            for keyword, comment in iter_merged_comments(input_files):
+                if keyword not in spools:
+                    spools[keyword] = open(os.path.join(tmp_dir, f"{len(spools)}.jsonl"), 'w+', encoding='utf-8')
+                    counts[keyword] = 0
+                spools[keyword].write(json.dumps(comment, ensure_ascii=False) + '\n')
+                counts[keyword] += 1
+
+            print(f"Converted data. Found {len(counts)} keywords.")
+
+            # Save to new format
+            print(f"Saving to {output_file}...")
+            with open(output_file, 'w', encoding='utf-8') as f:
+                if not spools:
+                    f.write('{}')
+                else:
+                    f.write('{\n')
+                    for i, (keyword, spool) in enumerate(spools.items()):
+                        f.write(f'    {json.dumps(keyword, ensure_ascii=False)}: [\n')
+                        spool.seek(0)
+                        for j, line in enumerate(spool):
+                            f.write(('' if j == 0 else ',\n') + '        ' + line.rstrip('\n'))
+                        f.write('\n    ]' + (',\n' if i < len(spools) - 1 else '\n'))
+                    f.write('}')
+        finally:
+            for spool in spools.values():
+                spool.close()
+    return counts
+
 
 def main():
-    input_file = 'dcard_data_20251201_221552.json'
-    output_file = 'dcard_comments_by_keyword.json'
+    # 可接受 scrapper.py 輸出的 .json / .jsonl / .jsonl.gz，可一次合併多個檔案
+    parser = argparse.ArgumentParser(description="把 Dcard 爬取結果轉成 {keyword: [comments]}")
+    parser.add_argument('inputs', nargs='*', default=['dcard_data_20251201_221552.json'],
+                        help="爬取結果檔案，可指定多個 (預設: %(default)s)")
+    parser.add_argument('-o', '--output', default='dcard_comments_by_keyword.json',
+                        help="輸出檔案 (預設: %(default)s)")
+    args = parser.parse_args()
 
-    if not os.path.exists(input_file):
-        print(f"File {input_file} not found.")
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        for path in missing:
+            print(f"File {path} not found.")
         return
 
-    print(f"Loading data from {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Aggregate comments by keyword
-    keyword_comments = {}
-
-    for item in data:
-        keyword = item.get('keyword')
-        comments = item.get('comments', [])
-        
-        if keyword and comments:
-            if keyword not in keyword_comments:
-                keyword_comments[keyword] = []
-            
-            # Add comments to the list
-            keyword_comments[keyword].extend(comments)
-
-    print(f"Converted data. Found {len(keyword_comments)} keywords.")
-    
-    # Save to new format
-    print(f"Saving to {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(keyword_comments, f, ensure_ascii=False, indent=4)
+    convert(args.inputs, args.output)
     print("Done.")
 
 if __name__ == "__main__":
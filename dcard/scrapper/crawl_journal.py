@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+
+from article_stream import is_jsonl, iter_articles
+
+# 進度日誌：每行一筆 JSON，只會往後附加，不會改寫舊資料
+# 紀錄種類：
+#   {"type": "keyword_urls", "keyword": ..., "start_date": ..., "end_date": ..., "articles": [article_info, ...]}
+#   {"type": "output", "path": ...}                 這次執行的輸出檔
+#   {"type": "article", "keyword": ..., "url": ...} 文章已成功寫入輸出檔
+# 文章內容不存在日誌裡，--resume 時從之前的輸出檔讀回
+JOURNAL_FILE = "dcard_crawl_journal.jsonl"
+
+
+class CrawlJournal:
+    """
+    Dcard 爬蟲的進度日誌
+    - 每個關鍵字收集完文章列表後寫入一筆 keyword_urls
+    - 每篇文章寫入輸出檔後寫入一筆 article (只有 JSON Lines 輸出會邊爬邊寫，才記錄)
+    --resume 時讀回日誌，已收集過的文章列表與已爬過的文章都不會再重爬；
+    記憶體中只保留已完成文章的 (keyword, url)，文章內容從之前的輸出檔逐篇讀回
+    """
+
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keyword_urls = {}   # keyword -> {"start_date", "end_date", "articles"}
+        self._done = set()        # {(keyword, url)}
+        self._outputs = []        # 之前執行的輸出檔
+        self._track_articles = False
+
+        if resume and os.path.exists(path):
+            self._load()
+            print(f"📒 從進度日誌 {path} 恢復：{len(self._keyword_urls)} 個關鍵字的文章列表、"
+                  f"{len(self._done)} 篇已完成文章")
+            mode = "a"
+        else:
+            if os.path.exists(path):
+                print(f"📒 重新開始，覆寫舊的進度日誌 {path}")
+            mode = "w"
+
+        self._file = open(path, mode, encoding="utf-8")
+        if mode == "a" and self._file.tell() > 0 and not self._ends_with_newline():
+            # 上次寫到一半的行補上換行，新紀錄才不會黏在殘缺的那一行後面
+            self._file.write("\n")
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 當機時最後一行可能只寫了一半，略過即可
+                    print(f"⚠️  進度日誌第 {line_no} 行不完整，已略過")
+                    continue
+                self._apply(record)
+
+    def _apply(self, record):
+        if record.get("type") == "keyword_urls":
+            self._keyword_urls[record["keyword"]] = {
+                "start_date": record["start_date"],
+                "end_date": record["end_date"],
+                "articles": record["articles"],
+            }
+        elif record.get("type") == "output":
+            self._outputs.append(record["path"])
+        elif record.get("type") == "article" and "url" in record:
+            self._done.add((record["keyword"], record["url"]))
+
+    def _append(self, record, apply=True):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if apply:
+                self._apply(record)
+            # 確保每筆紀錄都完整落地，當機時最多只損失正在寫的那一行
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def get_article_list(self, keyword, start_date, end_date):
+        """
+        取得之前收集過的文章列表；時間範圍不同時視為沒有紀錄
+        """
+        with self._lock:
+            entry = self._keyword_urls.get(keyword)
+        if entry and entry["start_date"] == start_date and entry["end_date"] == end_date:
+            return entry["articles"]
+        return None
+
+    def record_article_list(self, keyword, start_date, end_date, article_data_list):
+        self._append({
+            "type": "keyword_urls",
+            "keyword": keyword,
+            "start_date": start_date,
+            "end_date": end_date,
+            "articles": article_data_list,
+        })
+
+    def record_output(self, output_path):
+        """
+        記錄這次執行的輸出檔；之後的 --resume 會從這裡讀回已完成的文章
+        .json 輸出要到結束時才一次寫出，中斷時檔案裡沒有文章，因此不記錄單篇文章
+        """
+        self._track_articles = is_jsonl(output_path)
+        if self._track_articles:
+            # 這次的輸出檔不加入 _outputs：本次已完成的文章本來就寫在裡面，不需要再讀回
+            self._append({"type": "output", "path": output_path}, apply=False)
+
+    def is_article_done(self, keyword, url):
+        with self._lock:
+            return (keyword, url) in self._done
+
+    def record_article(self, keyword, url):
+        """
+        文章已寫入輸出檔後呼叫
+        """
+        if self._track_articles:
+            self._append({"type": "article", "keyword": keyword, "url": url})
+
+    def iter_finished_articles(self, keyword, urls):
+        """
+        從之前的輸出檔逐篇讀回 urls 中已完成的文章 (每個 url 只回傳一次)
+        輸出檔遺失或被截斷而讀不到的文章不會回傳，呼叫端應重新爬取
+        """
+        with self._lock:
+            wanted = {url for url in urls if (keyword, url) in self._done}
+            outputs = list(self._outputs)
+        for output_path in outputs:
+            if not wanted:
+                return
+            if not os.path.exists(output_path):
+                print(f"⚠️  找不到之前的輸出檔 {output_path}，其中的文章會重新爬取")
+                continue
+            for article in iter_articles(output_path):
+                if article.get("keyword") == keyword and article.get("url") in wanted:
+                    wanted.discard(article["url"])
+                    yield article
+
+    def is_keyword_done(self, keyword, start_date, end_date):
+        """
+        文章列表已收集、且列表中每篇文章都已爬完，才算完成
+        """
+        article_data_list = self.get_article_list(keyword, start_date, end_date)
+        if article_data_list is None:
+            return False
+        return all(self.is_article_done(keyword, a["url"]) for a in article_data_list)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,102 @@
+import json
+import os
+import hashlib
+import threading
+from datetime import datetime
+
+# 增量爬取狀態：記住每個關鍵字看過的最新文章時間，以及每篇文章看過的留言
+# {
+#   "keywords": {keyword: {"newest_date": "YYYY-MM-DD HH:MM:SS", "articles": [article_info, ...]}},
+#   "articles": {url: {"comment_count": 顯示的留言數, "comment_hashes": [...]}}
+# }
+STATE_FILE = "dcard_incremental_state.json"
+
+
+def comment_hash(text):
+    # 留言沒有穩定可取的 id，以內容雜湊當作 id；取前 16 碼已足夠區分
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+
+
+class IncrementalState:
+    """
+    每日增量爬取用的狀態檔
+    - 搜尋頁捲到已知的文章時間就停止，只收集新文章
+    - 已知文章的留言數沒變就不捲動留言區，有變只輸出新留言
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keywords = {}
+        self._articles = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._keywords = data.get("keywords", {})
+            self._articles = data.get("articles", {})
+            print(f"🔁 載入增量狀態 {path}：{len(self._keywords)} 個關鍵字、{len(self._articles)} 篇已知文章")
+
+    def newest_date(self, keyword):
+        """
+        該關鍵字已看過的最新文章時間；沒有紀錄時回傳 None
+        """
+        with self._lock:
+            entry = self._keywords.get(keyword)
+        if not entry or not entry.get("newest_date"):
+            return None
+        return datetime.strptime(entry["newest_date"], "%Y-%m-%d %H:%M:%S")
+
+    def known_articles(self, keyword):
+        with self._lock:
+            return list(self._keywords.get(keyword, {}).get("articles", []))
+
+    def is_known(self, url):
+        with self._lock:
+            return url in self._articles
+
+    def comment_count(self, url):
+        with self._lock:
+            entry = self._articles.get(url)
+        return entry["comment_count"] if entry else None
+
+    def new_comments(self, url, comments):
+        """
+        過濾掉上次已經看過的留言，只回傳新留言
+        """
+        with self._lock:
+            entry = self._articles.get(url)
+            seen = set(entry["comment_hashes"]) if entry else set()
+        return [c for c in comments if comment_hash(c) not in seen]
+
+    def update_article(self, keyword, article_info, comments, comment_count=None):
+        """
+        記錄這篇文章目前看到的留言；comment_count 為頁面上顯示的留言數 (抓不到時用實際抓到的數量)
+        """
+        with self._lock:
+            entry = self._articles.setdefault(article_info["url"], {"comment_count": 0, "comment_hashes": []})
+            hashes = set(entry["comment_hashes"])
+            for c in comments:
+                h = comment_hash(c)
+                if h not in hashes:
+                    hashes.add(h)
+                    entry["comment_hashes"].append(h)
+            entry["comment_count"] = comment_count if comment_count is not None else len(entry["comment_hashes"])
+
+            kw_entry = self._keywords.setdefault(keyword, {"newest_date": None, "articles": []})
+            if all(a["url"] != article_info["url"] for a in kw_entry["articles"]):
+                kw_entry["articles"].append(article_info)
+            parsed_date = article_info.get("parsed_date")
+            if parsed_date and parsed_date != "未知":
+                if kw_entry["newest_date"] is None or parsed_date > kw_entry["newest_date"]:
+                    kw_entry["newest_date"] = parsed_date
+
+    def save(self):
+        with self._lock:
+            data = {"keywords": self._keywords, "articles": self._articles}
+            # 先寫暫存檔再取代，避免寫到一半當機把狀態檔弄壞
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        print(f"🔁 增量狀態已儲存至 {self.path}")
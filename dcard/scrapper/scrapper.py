@@ -1,14 +1,23 @@
-import json
 import time
 import random
 import os
+import queue
+import threading
+import argparse
+import sys
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import undetected_chromedriver as uc
+
+from crawl_journal import CrawlJournal, JOURNAL_FILE
+from incremental_state import IncrementalState, STATE_FILE
+from article_stream import ArticleWriter, OUTPUT_FORMATS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.replay import save_snapshot
+from common.page_waits import wait_for_page_ready, wait_for_more_content, wait_stats, mark_page, scroll_to_bottom
+from common.driver_factory import make_driver
 
 # ================= 設定區 =================
 # 關鍵字設定：每個關鍵字可指定時間範圍
@@ -25,21 +34,144 @@ KEYWORDS_CONFIG = [
 ]
 
 MAX_SCROLL_TIMES = 50  # 每篇文章要在留言區捲動幾次 (載入更多留言)
+BOTTOM_CONFIRM_ROUNDS = 3  # 連續幾次捲動都沒有變高才視為留言已到底 (避免慢的請求被誤判為到底)
+
+# 瀏覽器設定：無頭 + 不載入圖片/影音/字型/追蹤器，降低每個 worker 的載入時間與記憶體
+HEADLESS = True
+LEAN_BROWSER = True
+
+# 輸出格式："jsonl" / "jsonl.gz" = 每爬完一篇就寫出一行；"json" = 原本結束時一次寫出整個陣列
+OUTPUT_FORMAT = "jsonl"
+
+# 平行爬取設定：NUM_WORKERS 個瀏覽器同時從共用佇列取工作
+# 所有 worker 共用同一個禮貌間隔，整體開頁速度不會超過 1 / MIN_REQUEST_INTERVAL 頁/秒
+NUM_WORKERS = 1               # 1 = 原本的單一瀏覽器依序爬取
+MIN_REQUEST_INTERVAL = 1.5    # 全域兩次開頁之間至少間隔幾秒
+REQUEST_JITTER = 1.0          # 額外隨機延遲 (0 ~ REQUEST_JITTER 秒)，避免規律的請求節奏
+
+ARTICLE_LINK_XPATH = '//a[contains(@href, "/f/") and contains(@href, "/p/")]'
+# 搜尋結果卡片 (文章連結的父節點)；一張卡片可能有多個文章連結，計數時一律以卡片為準
+SEARCH_CARD_XPATH = ARTICLE_LINK_XPATH + '/..'
+COMMENT_XPATH = '//div[contains(@id, "comment-")]'
+COMMENT_TEXT_XPATH = './/div[@class="d_xa_34 d_xj_2v c1ehvwc9"]/span'
+KNOWN_STOP_COUNT = 3  # 增量模式：連續遇到幾篇已知文章就停止搜尋 (容許置頂文章穿插)
+
+# 日期跳轉：時間範圍在很久以前時，先以指數增加的捲動次數快速往下，
+# 只檢查最後一張卡片的日期，到達 end_date 後再以二分搜尋找出範圍內第一張卡片
+SEEK_TO_DATE = True
+SEEK_MAX_SCROLLS = 300  # 跳轉階段最多捲動幾次 (不計入收集階段的 max_scroll_attempts)
+
+# 文章頁留言區標題顯示的留言總數，例如「共 123 則留言」
+_COMMENT_COUNT_JS = """
+var m = document.body.innerText.match(/共\\s*([\\d,]+)\\s*則留言/);
+return m ? parseInt(m[1].replace(/,/g, ''), 10) : null;
+"""
+DATE_HINTS = ["月", "小時前", "分鐘前", "昨天", "今天"]
+
+# 擷取方式："js" = 每頁注入一段 JavaScript 一次取回所有卡片/留言
+#           "webdriver" = 原本逐一 find_element 的方式 (較慢，但不依賴 JS)
+EXTRACTION_MODE = "js"
+
+# 與 _read_search_cards_webdriver 相同的邏輯，在瀏覽器內執行
+# listCards(linkXpath) 取得所有卡片，readCard(card, hints) 回傳 [href, datetime, dateText]
+_CARD_HELPERS_JS = """
+var first = function (node, xpath) {
+    return document.evaluate(xpath, node, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+};
+var listCards = function (linkXpath) {
+    var snap = document.evaluate(linkXpath + '/..', document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var cards = [];
+    for (var i = 0; i < snap.snapshotLength; i++) cards.push(snap.snapshotItem(i));
+    return cards;
+};
+var readCard = function (card, hints) {
+    var link = first(card, './/a[contains(@href, "/f/") and contains(@href, "/p/")]');
+    if (!link) return null;
+    var datetimeAttr = null, dateText = null;
+    var timeElem = card.querySelector('time');
+    if (timeElem) {
+        datetimeAttr = timeElem.getAttribute('datetime');
+        dateText = timeElem.innerText;
+    } else {
+        var dateElem = first(card, './/span[contains(@class, "date")] | .//span[contains(text(), "月") or contains(text(), "小時")]');
+        if (dateElem) {
+            dateText = dateElem.innerText;
+        } else {
+            var lines = card.innerText.split('\\n');
+            for (var j = 0; j < lines.length && dateText === null; j++) {
+                for (var k = 0; k < hints.length; k++) {
+                    if (lines[j].indexOf(hints[k]) !== -1) { dateText = lines[j]; break; }
+                }
+            }
+        }
+    }
+    return [link.href, datetimeAttr, dateText];
+};
+"""
+
+# 一次取回整頁從第 arguments[2] 張起的所有卡片：[[href, datetime, dateText], ...]
+_SEARCH_CARDS_JS = _CARD_HELPERS_JS + """
+var cards = listCards(arguments[0]), result = [];
+for (var i = arguments[2] || 0; i < cards.length; i++) {
+    var card = readCard(cards[i], arguments[1]);
+    if (card) result.push(card);
+}
+return result;
+"""
+
+# 只讀第 arguments[2] 張卡片 (負數代表從最後往回數)：[卡片總數, [href, datetime, dateText] 或 null]
+# arguments[3] 為 true 時順便把該卡片捲到畫面頂端
+_CARD_AT_JS = _CARD_HELPERS_JS + """
+var cards = listCards(arguments[0]);
+var i = arguments[2] < 0 ? cards.length + arguments[2] : arguments[2];
+if (i < 0 || i >= cards.length) return [cards.length, null];
+if (arguments[3]) cards[i].scrollIntoView({block: 'start'});
+return [cards.length, readCard(cards[i], arguments[1])];
+"""
+
+# 與 _read_comments_webdriver 相同的邏輯，回傳所有留言文字陣列
+_COMMENTS_JS = """
+var snap = document.evaluate(arguments[0], document, null,
+                             XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var texts = [];
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var span = document.evaluate(arguments[1], snap.snapshotItem(i), null,
+                                 XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (span) texts.push(span.innerText);
+}
+return texts;
+"""
 # =========================================
 
 def setup_driver():
-    options = Options()
-    # 改為使用乾淨的瀏覽器環境，不再讀取本機 User Data
+    # 使用乾淨的瀏覽器環境，不讀取本機 User Data
     # 這樣執行時不需要關閉您平常使用的瀏覽器
-    
-    # 避免一些自動化檢測的 flag
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    
-    # driver = webdriver.Edge(options=options)
-    driver = uc.Chrome()
-    return driver
+    # Dcard 有 Cloudflare 檢測，沿用 undetected_chromedriver
+    return make_driver(headless=HEADLESS, lean=LEAN_BROWSER, undetected=True)
+
+
+class PolitenessBudget:
+    """
+    多個 worker 共用的全域請求間隔
+    每次 driver.get 之前呼叫 wait()，保證所有瀏覽器加起來的開頁頻率不超過設定值
+    """
+
+    def __init__(self, min_interval=MIN_REQUEST_INTERVAL, jitter=REQUEST_JITTER):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        # 在鎖內預約下一個時段，鎖外再睡，避免 worker 彼此卡住
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval + random.uniform(0, self.jitter)
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
 
 def parse_date_from_element(date_text=None, datetime_attr=None):
@@ -98,9 +230,150 @@ def is_date_in_range(article_date, start_date_str, end_date_str):
         return True  # 日期格式錯誤時，保留該文章
 
 
-def scrape_keyword(driver, keyword, start_date, end_date):
+def _read_search_cards_webdriver(driver, start=0):
     """
-    爬取單一關鍵字的所有符合時間範圍的文章
+    逐張卡片用 WebDriver 讀取，每張卡片需要多次來回
+    """
+    cards = []
+    for card in driver.find_elements(By.XPATH, ARTICLE_LINK_XPATH + '/..')[start:]:
+        try:
+            # 取得文章連結
+            link_elem = card.find_element(By.XPATH, './/a[contains(@href, "/f/") and contains(@href, "/p/")]')
+            href = link_elem.get_attribute('href')
+            
+            # 嘗試取得日期 - 優先從 <time> 標籤獲取 datetime 屬性
+            date_text = None
+            datetime_attr = None
+            
+            try:
+                # 優先嘗試找尋 <time> 標籤並取得 datetime 屬性
+                time_elem = card.find_element(By.XPATH, './/time')
+                datetime_attr = time_elem.get_attribute('datetime')
+                date_text = time_elem.text  # 同時也取得顯示文字作為備用
+            except:
+                # 如果找不到 <time> 標籤，嘗試其他選擇器
+                try:
+                    date_elem = card.find_element(By.XPATH, './/span[contains(@class, "date")] | .//span[contains(text(), "月") or contains(text(), "小時")]')
+                    date_text = date_elem.text
+                except:
+                    # 如果找不到明確的日期元素，嘗試從整個卡片文字中尋找
+                    card_text = card.text
+                    # 簡單的日期關鍵字匹配
+                    for line in card_text.split('\n'):
+                        if any(keyword in line for keyword in DATE_HINTS):
+                            date_text = line
+                            break
+            
+            cards.append((href, datetime_attr, date_text))
+        except Exception:
+            continue
+    return cards
+
+
+def _read_comments_webdriver(driver):
+    """
+    逐則留言用 WebDriver 讀取文字
+    """
+    comments = []
+    for comment in driver.find_elements(By.XPATH, COMMENT_XPATH):
+        try:
+            text_div = comment.find_element(By.XPATH, COMMENT_TEXT_XPATH)
+            comments.append(text_div.text)
+        except:
+            continue
+    return comments
+
+
+def read_search_cards(driver, start=0):
+    """
+    讀取搜尋結果頁上從第 start 張起的文章卡片，回傳 [(href, datetime 屬性, 日期文字), ...]
+    EXTRACTION_MODE = "js" 時整頁只需一次 execute_script
+    """
+    if EXTRACTION_MODE == "js":
+        try:
+            return [tuple(card) for card in driver.execute_script(_SEARCH_CARDS_JS, ARTICLE_LINK_XPATH, DATE_HINTS, start)]
+        except Exception as e:
+            print(f"⚠️  JS 擷取卡片失敗，改用 WebDriver 逐一讀取: {e}")
+    return _read_search_cards_webdriver(driver, start)
+
+
+def read_comments(driver):
+    """
+    讀取文章頁上所有留言文字
+    EXTRACTION_MODE = "js" 時整頁只需一次 execute_script
+    """
+    if EXTRACTION_MODE == "js":
+        try:
+            return driver.execute_script(_COMMENTS_JS, COMMENT_XPATH, COMMENT_TEXT_XPATH)
+        except Exception as e:
+            print(f"⚠️  JS 擷取留言失敗，改用 WebDriver 逐一讀取: {e}")
+    return _read_comments_webdriver(driver)
+
+
+def probe_card(driver, index, scroll_into_view=False):
+    """
+    只讀取第 index 張卡片的日期 (負數代表從最後往回數)
+    回傳 (卡片總數, 解析後的日期或 None)
+    """
+    count, card = driver.execute_script(_CARD_AT_JS, ARTICLE_LINK_XPATH, DATE_HINTS, index, scroll_into_view)
+    if not card:
+        return count, None
+    _, datetime_attr, date_text = card
+    return count, parse_date_from_element(date_text=date_text, datetime_attr=datetime_attr)
+
+
+def seek_to_date(driver, end_date_obj):
+    """
+    搜尋結果依最新排序，先跳過所有比 end_date 新的文章：
+    1. 指數跳轉：每輪捲動 1, 2, 4, 8... 次，每輪只檢查最後一張卡片的日期，
+       直到最後一張卡片不晚於 end_date (或沒有更多結果)
+    2. 二分搜尋：在已載入的卡片中找出第一張不晚於 end_date 的卡片並捲到畫面上
+    回傳該卡片的索引，收集階段從這張卡片開始讀取，前面的卡片都比 end_date 新
+    """
+    count, last_date = probe_card(driver, -1)
+    scrolls = 0
+    jump = 1
+    at_bottom = False
+
+    while last_date is not None and last_date > end_date_obj and scrolls < SEEK_MAX_SCROLLS and not at_bottom:
+        for _ in range(jump):
+            if scrolls >= SEEK_MAX_SCROLLS:
+                break
+            # 捲動前後都以 SEARCH_CARD_XPATH 計算卡片數 (與 probe_card 的卡片相同)
+            since = mark_page(driver)
+            height, previous_count = scroll_to_bottom(driver, SEARCH_CARD_XPATH)
+            _, count = wait_for_more_content(driver, height, count_xpath=SEARCH_CARD_XPATH,
+                                             previous_count=previous_count, name="search_seek", since=since)
+            scrolls += 1
+            if count <= previous_count:
+                # 沒有載入新卡片，已經到搜尋結果底部
+                at_bottom = True
+                break
+        count, last_date = probe_card(driver, -1)
+        print(f"⏩ 跳轉中... 已捲動 {scrolls} 次，{count} 張卡片，最後一張日期: {last_date}")
+        jump *= 2
+
+    # 二分搜尋第一張不晚於 end_date 的卡片；無法解析日期的卡片視為在範圍內
+    lo, hi = 0, max(count - 1, 0)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        _, mid_date = probe_card(driver, mid)
+        if mid_date is None or mid_date <= end_date_obj:
+            hi = mid
+        else:
+            lo = mid + 1
+
+    if count:
+        probe_card(driver, lo, scroll_into_view=True)
+    print(f"⏩ 跳轉完成：捲動 {scrolls} 次，範圍內第一篇約在第 {lo + 1} 張卡片")
+    return lo
+
+
+def collect_article_list(driver, keyword, start_date, end_date, budget=None, stop_at=None, known_urls=None):
+    """
+    在搜尋結果頁捲動，收集符合時間範圍的文章連結與日期
+    stop_at / known_urls: 增量模式下上次看過的最新文章時間與已知文章，
+                          搜尋結果依最新排序，捲到已知的文章就代表後面都看過了
     """
     print(f"\n{'='*60}")
     print(f"🚀 開始搜尋關鍵字: {keyword}")
@@ -108,6 +381,8 @@ def scrape_keyword(driver, keyword, start_date, end_date):
     print(f"{'='*60}\n")
     
     search_url = f"https://www.dcard.tw/search?query={keyword}&sort=latest"
+    if budget is not None:
+        budget.wait()
     driver.get(search_url)
     
     # 等待搜尋結果載入
@@ -119,7 +394,15 @@ def scrape_keyword(driver, keyword, start_date, end_date):
         print(f"⚠️  搜尋 '{keyword}' 無結果或載入失敗")
         return []
     
-    time.sleep(2)
+    wait_for_page_ready(driver, ready_xpath=ARTICLE_LINK_XPATH, baseline=2.0)
+
+    # 跳轉成功時，前 start_index 張卡片都比 end_date 新，收集時直接略過不讀取
+    start_index = 0
+    if SEEK_TO_DATE:
+        try:
+            start_index = seek_to_date(driver, datetime.strptime(end_date, "%Y-%m-%d"))
+        except Exception as e:
+            print(f"⚠️  日期跳轉失敗，改為從頭逐步捲動: {e}")
 
     # 收集文章連結與日期
     article_data_list = []
@@ -127,6 +410,8 @@ def scrape_keyword(driver, keyword, start_date, end_date):
     scroll_count = 0
     no_new_links_count = 0
     out_of_range_count = 0  # 連續超出範圍的文章數
+    known_count = 0  # 連續遇到的已知文章數 (增量模式)
+    known_urls = known_urls or set()
     
     start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
     end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
@@ -134,47 +419,29 @@ def scrape_keyword(driver, keyword, start_date, end_date):
     collected_urls = set()
     
     while scroll_count < max_scroll_attempts:
-        # 收集當前頁面上的文章
-        # 找尋文章卡片，通常包含連結和日期
-        article_cards = driver.find_elements(By.XPATH, '//a[contains(@href, "/f/") and contains(@href, "/p/")]/..')
+        # 收集當前頁面上的文章 (連結、datetime 屬性、日期文字)
+        cards = read_search_cards(driver, start_index)
         
         previous_count = len(article_data_list)
         
-        for card in article_cards:
+        for href, datetime_attr, date_text in cards:
             try:
-                # 取得文章連結
-                link_elem = card.find_element(By.XPATH, './/a[contains(@href, "/f/") and contains(@href, "/p/")]')
-                href = link_elem.get_attribute('href')
-                
                 if not href or href in collected_urls:
                     continue
                 
-                # 嘗試取得日期 - 優先從 <time> 標籤獲取 datetime 屬性
-                date_text = None
-                datetime_attr = None
-                
-                try:
-                    # 優先嘗試找尋 <time> 標籤並取得 datetime 屬性
-                    time_elem = card.find_element(By.XPATH, './/time')
-                    datetime_attr = time_elem.get_attribute('datetime')
-                    date_text = time_elem.text  # 同時也取得顯示文字作為備用
-                except:
-                    # 如果找不到 <time> 標籤，嘗試其他選擇器
-                    try:
-                        date_elem = card.find_element(By.XPATH, './/span[contains(@class, "date")] | .//span[contains(text(), "月") or contains(text(), "小時")]')
-                        date_text = date_elem.text
-                    except:
-                        # 如果找不到明確的日期元素，嘗試從整個卡片文字中尋找
-                        card_text = card.text
-                        # 簡單的日期關鍵字匹配
-                        for line in card_text.split('\n'):
-                            if any(keyword in line for keyword in ["月", "小時前", "分鐘前", "昨天", "今天"]):
-                                date_text = line
-                                break
-                
                 # 解析日期 (優先使用 datetime 屬性)
                 article_date = parse_date_from_element(date_text=date_text, datetime_attr=datetime_attr)
                 
+                # 增量模式：已經看過的文章不再收集，連續遇到數篇就停止捲動
+                if href in known_urls or (stop_at and article_date and article_date <= stop_at):
+                    known_count += 1
+                    if known_count >= KNOWN_STOP_COUNT:
+                        print(f"🔁 已捲到上次看過的文章，停止搜尋")
+                        scroll_count = max_scroll_attempts  # 強制結束
+                        break
+                    continue
+                known_count = 0
+                
                 # 檢查日期是否在範圍內
                 if article_date:
                     if article_date < start_date_obj:
@@ -216,101 +483,249 @@ def scrape_keyword(driver, keyword, start_date, end_date):
         else:
             no_new_links_count = 0
         
-        # 如果已經遇到太多超出範圍的文章，停止
-        if out_of_range_count >= 10:
+        # 如果已經遇到太多超出範圍的文章或已知文章，停止
+        if out_of_range_count >= 10 or known_count >= KNOWN_STOP_COUNT:
             break
         
-        # 往下捲動以載入更多文章
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(1.5, 2.5))
+        # 往下捲動以載入更多文章，新卡片出現或頁面閒置就立即繼續
+        since = mark_page(driver)
+        height, card_count = scroll_to_bottom(driver, SEARCH_CARD_XPATH)
+        wait_for_more_content(driver, height, count_xpath=SEARCH_CARD_XPATH,
+                              previous_count=card_count, name="search_scroll", since=since)
         scroll_count += 1
     
+    save_snapshot(driver, "dcard", f"search_{keyword}")
     print(f"\n📋 關鍵字 '{keyword}' 找到 {len(article_data_list)} 篇符合時間範圍的文章\n")
-    
-    # 爬取每篇文章的詳細內容
-    results = []
-    for index, article_info in enumerate(article_data_list):
-        url = article_info["url"]
-        print(f"[{index+1}/{len(article_data_list)}] 正在爬取: {url}")
-        driver.get(url)
-        time.sleep(random.uniform(2, 4))
-
-        article_data = {
-            "keyword": keyword,
-            "url": url,
-            "date": article_info["parsed_date"],
-            "title": "N/A",
-            "content": "N/A",
-            "comments": []
-        }
+    return article_data_list
 
-        try:
-            # --- 抓取標題 ---
-            title_elem = driver.find_element(By.TAG_NAME, "h1")
-            article_data["title"] = title_elem.text
 
-            # --- 抓取文章內容 ---
+def read_displayed_comment_count(driver):
+    """
+    讀取頁面上顯示的留言總數，抓不到時回傳 None
+    """
+    try:
+        return driver.execute_script(_COMMENT_COUNT_JS)
+    except Exception:
+        return None
+
+
+def scrape_article(driver, keyword, article_info, budget=None, state=None):
+    """
+    爬取單篇文章的標題、內容與留言
+    budget: 共用的 PolitenessBudget，開頁前先等待；None 表示不限速
+    state: 增量模式的 IncrementalState；已知文章留言數沒變就不捲動，
+           有變化時 comments 只包含新留言
+    回傳 (article_data, complete)；過程中發生錯誤時 complete 為 False (資料可能不完整)
+    """
+    url = article_info["url"]
+    if budget is not None:
+        budget.wait()
+    driver.get(url)
+    wait_for_page_ready(driver, ready_xpath="//h1", baseline=3.0)
+
+    article_data = {
+        "keyword": keyword,
+        "url": url,
+        "date": article_info["parsed_date"],
+        "title": "N/A",
+        "content": "N/A",
+        "comments": []
+    }
+
+    try:
+        # --- 抓取標題 ---
+        title_elem = driver.find_element(By.TAG_NAME, "h1")
+        article_data["title"] = title_elem.text
+
+        # --- 抓取文章內容 ---
+        try:
+            content_elem = driver.find_element(By.XPATH, '//div[contains(@class, "c04j7q-0")] | //article//div[contains(@class, "phqjxq-0")]')
+            if not content_elem:
+                content_elem = driver.find_element(By.CSS_SELECTOR, "article div")
+            article_data["content"] = content_elem.text
+        except:
             try:
-                content_elem = driver.find_element(By.XPATH, '//div[contains(@class, "c04j7q-0")] | //article//div[contains(@class, "phqjxq-0")]')
-                if not content_elem:
-                    content_elem = driver.find_element(By.CSS_SELECTOR, "article div")
-                article_data["content"] = content_elem.text
+                full_article = driver.find_element(By.TAG_NAME, "article").text
+                article_data["content"] = full_article
             except:
-                try:
-                    full_article = driver.find_element(By.TAG_NAME, "article").text
-                    article_data["content"] = full_article
-                except:
-                    article_data["content"] = "無法提取內容"
+                article_data["content"] = "無法提取內容"
 
-            # --- 抓取留言 ---
-            print("   └── 正在載入留言...")
-            
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            scroll_attempts = 0
+        # --- 抓取留言 ---
+        displayed_count = None
+        if state is not None:
+            displayed_count = read_displayed_comment_count(driver)
+            if state.is_known(url) and displayed_count is not None and displayed_count == state.comment_count(url):
+                print(f"   └── 🔁 留言數未變 ({displayed_count} 則)，略過")
+                return article_data, True
+
+        print("   └── 正在載入留言...")
+        
+        last_height = driver.execute_script("return document.body.scrollHeight")
+        scroll_attempts = 0
+        no_growth = 0
+        
+        while scroll_attempts < MAX_SCROLL_TIMES:
+            since = mark_page(driver)
+            scroll_to_bottom(driver)
+            # 頁面一變高就立即返回；閒置仍無變化時再多試幾次才視為到底
+            new_height, _ = wait_for_more_content(driver, last_height, name="comment_scroll", since=since)
             
-            while scroll_attempts < MAX_SCROLL_TIMES:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(random.uniform(1.5, 2.5))
-                
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                
-                if new_height == last_height:
+            if new_height <= last_height:
+                no_growth += 1
+                if no_growth >= BOTTOM_CONFIRM_ROUNDS:
                     print("   └── 已到達頁面底部，開始抓取留言")
                     break
-                
-                last_height = new_height
-                scroll_attempts += 1
-                print(f"   └── 捲動中... ({scroll_attempts}/{MAX_SCROLL_TIMES})")
-            
-            comment_blocks = driver.find_elements(By.XPATH, '//div[contains(@id, "comment-")]')
+                continue
             
-            for comment in comment_blocks:
-                try:
-                    text_div = comment.find_element(By.XPATH, './/div[@class="d_xa_34 d_xj_2v c1ehvwc9"]/span')
-                    comment_content = text_div.text
-                    
-                    if comment_content == "":
-                        continue
-                    article_data["comments"].append(comment_content)
-                except:
-                    continue
+            no_growth = 0
+            last_height = new_height
+            scroll_attempts += 1
+            print(f"   └── 捲動中... ({scroll_attempts}/{MAX_SCROLL_TIMES})")
+        
+        save_snapshot(driver, "dcard", "article_" + url.rstrip("/").split("/")[-1])
+        for comment_content in read_comments(driver):
+            if comment_content == "":
+                continue
+            article_data["comments"].append(comment_content)
 
-            print(f"   └── 成功抓取 {len(article_data['comments'])} 則留言")
+        print(f"   └── 成功抓取 {len(article_data['comments'])} 則留言")
 
-        except Exception as e:
-            print(f"   ❌ 爬取文章時發生錯誤: {e}")
-        
-        results.append(article_data)
+        if state is not None:
+            all_comments = article_data["comments"]
+            article_data["comments"] = state.new_comments(url, all_comments)
+            state.update_article(keyword, article_info, all_comments, displayed_count)
+            print(f"   └── 🔁 其中 {len(article_data['comments'])} 則為新留言")
+
+    except Exception as e:
+        print(f"   ❌ 爬取文章時發生錯誤: {e}")
+        return article_data, False
+    
+    return article_data, True
+
+
+def get_article_list(driver, keyword, start_date, end_date, budget=None, journal=None, state=None):
+    """
+    取得關鍵字的文章列表：日誌中已有紀錄就直接沿用，否則到搜尋頁收集並寫入日誌
+    增量模式下只在搜尋頁收集新文章，再補上狀態檔中仍在時間範圍內的已知文章
+    """
+    if journal is not None:
+        article_data_list = journal.get_article_list(keyword, start_date, end_date)
+        if article_data_list is not None:
+            print(f"📒 關鍵字 '{keyword}' 沿用日誌中的 {len(article_data_list)} 篇文章列表")
+            return article_data_list
+
+    if state is not None:
+        known = [a for a in state.known_articles(keyword)
+                 if a.get("parsed_date") == "未知" or is_date_in_range(
+                     datetime.strptime(a["parsed_date"], "%Y-%m-%d %H:%M:%S"), start_date, end_date)]
+        article_data_list = collect_article_list(
+            driver, keyword, start_date, end_date, budget=budget,
+            stop_at=state.newest_date(keyword), known_urls={a["url"] for a in known}
+        )
+        new_urls = {a["url"] for a in article_data_list}
+        article_data_list += [a for a in known if a["url"] not in new_urls]
+    else:
+        article_data_list = collect_article_list(driver, keyword, start_date, end_date, budget=budget)
+    if journal is not None:
+        journal.record_article_list(keyword, start_date, end_date, article_data_list)
+    return article_data_list
+
+
+def iter_keyword_articles(driver, keyword, start_date, end_date, budget=None, journal=None, state=None):
+    """
+    逐篇產生單一關鍵字符合時間範圍的文章，爬完一篇就交出一篇
+    journal: CrawlJournal，已爬過的文章從之前的輸出檔讀回，成功爬完的文章寫出後記入日誌
+    state: IncrementalState，增量模式下只爬新文章與留言有變化的文章
+    """
+    article_data_list = get_article_list(driver, keyword, start_date, end_date,
+                                         budget=budget, journal=journal, state=state)
+
+    restored = set()
+    if journal is not None:
+        for article_data in journal.iter_finished_articles(keyword, [a["url"] for a in article_data_list]):
+            restored.add(article_data["url"])
+            yield article_data
+
+    # 爬取每篇文章的詳細內容
+    for index, article_info in enumerate(article_data_list):
+        if article_info["url"] in restored:
+            continue
+
+        print(f"[{index+1}/{len(article_data_list)}] 正在爬取: {article_info['url']}")
+        article_data, complete = scrape_article(driver, keyword, article_info, budget=budget, state=state)
+        yield article_data
+        # 呼叫端寫出這篇之後才會回到這裡；失敗或不完整的文章不寫入日誌，--resume 時會重新爬取
+        if journal is not None and complete:
+            journal.record_article(keyword, article_info["url"])
+
+
+def scrape_keyword(driver, keyword, start_date, end_date, budget=None, journal=None, state=None):
+    """
+    爬取單一關鍵字的所有符合時間範圍的文章
+    """
+    return list(iter_keyword_articles(driver, keyword, start_date, end_date,
+                                      budget=budget, journal=journal, state=state))
+
+
+def open_output(output_format=OUTPUT_FORMAT):
+    output_file = f'dcard_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{output_format}'
+    print(f"💾 爬取結果將寫入 {output_file}")
+    return ArticleWriter(output_file)
+
+
+def finish_output(writer):
+    """
+    關閉輸出檔並輸出各關鍵字統計
+    """
+    writer.close()
+    
+    print(f"\n{'='*70}")
+    print(f"✅ 所有爬取完成！")
+    print(f"📊 總共爬取 {writer.count} 篇文章")
+    print(f"💾 資料已儲存為 {writer.path}")
+    print(f"{'='*70}\n")
     
-    return results
+    # 輸出各關鍵字統計
+    print("\n📈 各關鍵字爬取統計：")
+    for kw, count in writer.keyword_stats.items():
+        print(f"   - {kw}: {count} 篇文章")
 
+    wait_stats.print_summary()
 
-def scrape_dcard():
+
+def scrape_dcard(num_workers=NUM_WORKERS, resume=False, incremental=False, output_format=OUTPUT_FORMAT):
     """
     主函數：依序爬取所有關鍵字
+    num_workers > 1 時改用 scrape_dcard_parallel
+    resume=True 時從進度日誌接續，已完成的關鍵字/文章不會重爬
+    incremental=True 時只爬新文章與新留言 (輸出中已知文章的 comments 只含新留言)
+    output_format: "jsonl" / "jsonl.gz" 邊爬邊寫，"json" 結束時一次寫出
+    """
+    journal = CrawlJournal(JOURNAL_FILE, resume=resume)
+    state = IncrementalState(STATE_FILE) if incremental else None
+    writer = open_output(output_format)
+    journal.record_output(writer.path)
+    try:
+        if num_workers > 1:
+            scrape_dcard_parallel(num_workers, writer, journal, state)
+        else:
+            scrape_dcard_sequential(writer, journal, state)
+        finish_output(writer)
+        # 輸出確定寫完才儲存增量狀態；中途失敗時不記住這次看過的留言，下次會重新輸出
+        if state is not None:
+            state.save()
+    finally:
+        writer.close()
+        journal.close()
+
+
+def scrape_dcard_sequential(writer, journal, state=None):
+    """
+    單一瀏覽器依序爬取所有關鍵字
     """
     driver = setup_driver()
-    all_results = []
+    # 等待改為事件驅動後，固定 sleep 不再兼任限速，單一 driver 也走全域禮貌間隔
+    budget = PolitenessBudget()
     
     try:
         for index, config in enumerate(KEYWORDS_CONFIG):
@@ -322,35 +737,21 @@ def scrape_dcard():
             print(f"# 處理第 {index+1}/{len(KEYWORDS_CONFIG)} 個關鍵字")
             print(f"{'#'*70}")
             
-            # 爬取該關鍵字的文章
-            results = scrape_keyword(driver, keyword, start_date, end_date)
-            all_results.extend(results)
+            keyword_done = journal.is_keyword_done(keyword, start_date, end_date)
+            if keyword_done:
+                print(f"📒 關鍵字 '{keyword}' 已在日誌中完成，略過")
+
+            # 爬取該關鍵字的文章，爬完一篇就寫出一篇
+            for article_data in iter_keyword_articles(driver, keyword, start_date, end_date,
+                                                      budget=budget, journal=journal, state=state):
+                writer.write(article_data)
+            if keyword_done:
+                continue
             
             # 每個關鍵字之間休息一下
             if index < len(KEYWORDS_CONFIG) - 1:
                 print(f"\n⏸️  休息 3 秒後繼續下一個關鍵字...\n")
                 time.sleep(3)
-        
-        # 儲存所有結果
-        output_file = f'dcard_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_results, f, ensure_ascii=False, indent=4)
-        
-        print(f"\n{'='*70}")
-        print(f"✅ 所有爬取完成！")
-        print(f"📊 總共爬取 {len(all_results)} 篇文章")
-        print(f"💾 資料已儲存為 {output_file}")
-        print(f"{'='*70}\n")
-        
-        # 輸出各關鍵字統計
-        keyword_stats = {}
-        for article in all_results:
-            kw = article["keyword"]
-            keyword_stats[kw] = keyword_stats.get(kw, 0) + 1
-        
-        print("\n📈 各關鍵字爬取統計：")
-        for kw, count in keyword_stats.items():
-            print(f"   - {kw}: {count} 篇文章")
 
     except Exception as e:
         print(f"發生嚴重錯誤: {e}")
@@ -360,5 +761,104 @@ def scrape_dcard():
         driver.quit()
 
 
+def crawl_worker(worker_id, task_queue, budget, writer, journal, state=None):
+    """
+    worker 執行緒：自己開一個瀏覽器，從共用佇列取工作直到收到 None
+    工作有兩種：
+      ("keyword", 關鍵字序號, config)          -> 收集文章列表，再把每篇文章放回佇列
+      ("article", 關鍵字序號, 文章序號, 關鍵字, article_info) -> 爬取單篇文章
+    """
+    driver = setup_driver()
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                task_queue.task_done()
+                break
+
+            try:
+                if task[0] == "keyword":
+                    _, kw_index, config = task
+                    keyword = config["keyword"]
+                    article_data_list = get_article_list(
+                        driver, keyword, config["start_date"], config["end_date"],
+                        budget=budget, journal=journal, state=state
+                    )
+                    positions = {a["url"]: i for i, a in enumerate(article_data_list)}
+                    restored = set()
+                    for article_data in journal.iter_finished_articles(keyword, list(positions)):
+                        restored.add(article_data["url"])
+                        writer.write(article_data, order_key=(kw_index, positions[article_data["url"]]))
+                    # 先放入文章工作再 task_done，task_queue.join() 才不會提早結束
+                    for art_index, article_info in enumerate(article_data_list):
+                        if article_info["url"] not in restored:
+                            task_queue.put(("article", kw_index, art_index, keyword, article_info))
+                else:
+                    _, kw_index, art_index, keyword, article_info = task
+                    print(f"[worker {worker_id}] 正在爬取: {article_info['url']}")
+                    article_data, complete = scrape_article(driver, keyword, article_info, budget=budget, state=state)
+                    writer.write(article_data, order_key=(kw_index, art_index))
+                    if complete:
+                        journal.record_article(keyword, article_info["url"])
+            except Exception as e:
+                print(f"   ❌ [worker {worker_id}] 工作失敗: {e}")
+            finally:
+                task_queue.task_done()
+    finally:
+        driver.quit()
+
+
+def scrape_dcard_parallel(num_workers, writer, journal, state=None):
+    """
+    平行版主函數：num_workers 個瀏覽器共用一個工作佇列與全域禮貌間隔
+    JSON Lines 輸出依完成順序寫出；JSON 輸出與依序爬取相同 (依 KEYWORDS_CONFIG 順序，再依搜尋結果順序)
+    """
+    task_queue = queue.Queue()
+    budget = PolitenessBudget()
+
+    for kw_index, config in enumerate(KEYWORDS_CONFIG):
+        task_queue.put(("keyword", kw_index, config))
+
+    print(f"\n🚀 啟動 {num_workers} 個 worker，共 {len(KEYWORDS_CONFIG)} 個關鍵字\n")
+    workers = []
+    for worker_id in range(num_workers):
+        t = threading.Thread(
+            target=crawl_worker,
+            args=(worker_id + 1, task_queue, budget, writer, journal, state),
+            daemon=True,
+        )
+        t.start()
+        workers.append(t)
+
+    try:
+        task_queue.join()
+    except KeyboardInterrupt:
+        print("\n使用者中斷，儲存目前已爬取的文章...")
+        # 丟掉尚未開始的工作，讓 worker 做完手上這篇就結束
+        while True:
+            try:
+                task_queue.get_nowait()
+                task_queue.task_done()
+            except queue.Empty:
+                break
+    finally:
+        for _ in workers:
+            task_queue.put(None)
+        for t in workers:
+            t.join()
+
+
 if __name__ == "__main__":
-    scrape_dcard()
+    parser = argparse.ArgumentParser(description="Dcard 關鍵字文章與留言爬蟲")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS,
+                        help="同時開啟的瀏覽器數量 (預設: %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"從 {JOURNAL_FILE} 接續上次中斷的爬取，略過已完成的關鍵字與文章")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"依 {STATE_FILE} 只爬新文章與新留言 (適合每日更新)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=OUTPUT_FORMAT,
+                        help="輸出格式 (預設: %(default)s)")
+    args = parser.parse_args()
+
+    scrape_dcard(num_workers=args.workers, resume=args.resume, incremental=args.incremental,
+                 output_format=args.format)
@@ -1,105 +1,58 @@
 import os
+import argparse
 
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 import json
 import torch
-from tqdm import tqdm
+import sys
 
-def main():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
+from common.sentiment_engine import MODEL_NAME, BACKENDS, SentimentCache, analyze_corpus, load_pipeline, cache_model_key
+
+def main(args):
     # Check for GPU
     device = 0 if torch.cuda.is_available() else -1
     print(f"Using device: {device}")
 
     # Input and Output files
-    input_file = 'dcard_comments_by_keyword.json'
+    input_file = CORPUS_FILE
     output_file = 'dcard_sentiment_by_keyword.json'
 
     # Load data
-    if not os.path.exists(input_file):
-        print(f"File {input_file} not found.")
-        return
-
     print(f"Loading data from {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    try:
+        # pipeline 需要 list，每個關鍵字的留言先轉成 list
+        data = {keyword: list(comments) for keyword, comments in load_comments_by_keyword("dcard").items()}
+    except FileNotFoundError as e:
+        print(e)
+        return
 
     # Model name
-    model_name = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
+    model_name = MODEL_NAME
 
-    print(f"Loading model: {model_name}...")
+    print(f"Loading model: {model_name} ({args.backend})...")
     try:
-        tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=False)
-        model = AutoModelForSequenceClassification.from_pretrained(model_name)
-        
-        # Move model to device
-        if device >= 0:
-            model = model.to(f'cuda:{device}')
-        
-        sentiment_pipeline = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=device)
+        # 多程序模式下模型只在各 worker 中載入
+        sentiment_pipeline = load_pipeline(args.backend, device, model_name) if args.workers <= 1 else None
     except Exception as e:
         print(f"Failed to load model: {e}")
         import traceback
         traceback.print_exc()
         return
 
-    # Label mapping
-    label_map = {
-        "negative": "負面",
-        "neutral": "中性",
-        "positive": "正面",
-        "LABEL_0": "負面",
-        "LABEL_1": "中性",
-        "LABEL_2": "正面"
-    }
-
     print("Starting sentiment analysis...")
-    results = {} # {keyword: [ {comment, sentiment, score}, ... ]}
 
-    # Process each keyword
-    for keyword, comments in tqdm(data.items()):
-        comment_sentiments = []
-        
-        if comments:
-            try:
-                # Process comments in batch
-                predictions = sentiment_pipeline(comments, truncation=True, max_length=512, batch_size=8)
-                
-                for comment, pred in zip(comments, predictions):
-                    sentiment_label = pred['label'].lower() if isinstance(pred['label'], str) else pred['label']
-                    if sentiment_label in label_map:
-                        sentiment_zh = label_map[sentiment_label]
-                    else:
-                        sentiment_zh = sentiment_label
-
-                    comment_sentiments.append({
-                        "comment": comment,
-                        "sentiment": sentiment_zh,
-                        "score": pred['score']
-                    })
-            except Exception as e:
-                print(f"Error processing comments for keyword {keyword}: {e}")
-                # Fallback: process one by one
-                for comment in comments:
-                    try:
-                        pred = sentiment_pipeline(comment, truncation=True, max_length=512)[0]
-                        sentiment_label = pred['label']
-                        sentiment_zh = label_map.get(sentiment_label, sentiment_label)
-                        if sentiment_zh not in ["正面", "中性", "負面"]:
-                             sentiment_zh = label_map.get(str(sentiment_label).lower(), sentiment_label)
-
-                        comment_sentiments.append({
-                            "comment": comment,
-                            "sentiment": sentiment_zh,
-                            "score": pred['score']
-                        })
-                    except Exception as inner_e:
-                        comment_sentiments.append({
-                            "comment": comment,
-                            "sentiment": "Error",
-                            "score": 0.0
-                        })
-
-        results[keyword] = comment_sentiments
+    # 已推論過的留言直接從快取取得結果
+    cache = None if args.no_cache else SentimentCache(model=cache_model_key(args.backend, model_name))
+
+    # 所有關鍵字的留言合併去重複後一起推論，再依原本的關鍵字與順序展開
+    results = analyze_corpus(data, sentiment_pipeline, cache, dynamic=args.batching == "dynamic",
+                             workers=args.workers, threads=args.threads, backend=args.backend,
+                             model_name=model_name) # {keyword: [ {comment, sentiment, score}, ... ]}
+
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
 
     # Save
     print(f"Saving results to {output_file}...")
@@ -159,4 +112,12 @@ def main():
     print("Done.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Dcard 留言情感分析")
+    parser.add_argument("--no-cache", action="store_true", help="不使用情感分析快取，全部重新推論")
+    parser.add_argument("--batching", choices=["dynamic", "fixed"], default="dynamic",
+                        help="dynamic: 依 token 長度分批；fixed: 依原順序每 8 則一批 (預設: %(default)s)")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch",
+                        help="推論後端：pytorch / int8 (動態量化，CPU) / onnx (onnxruntime，CPU) (預設: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="CPU 多程序推論的程序數 (預設: %(default)s)")
+    parser.add_argument("--threads", type=int, default=None, help="每個程序的 torch 執行緒數 (預設: CPU 核心數 / 程序數)")
+    main(parser.parse_args())
@@ -5,11 +5,14 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.cluster import AgglomerativeClustering
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 
 # Load data
-input_file = 'dcard_comments_by_keyword.json'
-with open(input_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+input_file = CORPUS_FILE
+data = load_comments_by_keyword("dcard")
 
 def preprocess(text):
     return " ".join(jieba.cut(text))
@@ -11,6 +11,10 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.cluster import AgglomerativeClustering
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 print("import OK!")
 
 
@@ -27,9 +31,8 @@ print(f"目前使用的設備是: {device}")
 
 
 # Load data
-input_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'facebook_comments_by_keyword.json')
-with open(input_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+input_file = CORPUS_FILE
+data = load_comments_by_keyword("facebook")
 
 def preprocess(text):
     return " ".join(jieba.cut(text))
@@ -14,6 +14,10 @@ import os
 import torch
 import re
 from sklearn.feature_extraction.text import CountVectorizer
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 
 
 # In[13]:
@@ -44,10 +48,9 @@ def clean_text(text):
 ##############
 
 platform_name = "fb"
-input_file_name = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "facebook_comments_by_keyword.json")
+input_file_name = CORPUS_FILE
 
-with open(input_file_name, "r", encoding="utf-8") as f:
-    fb_comments_dict = json.load(f)
+fb_comments_dict = load_comments_by_keyword("facebook")
 print(f"成功從{input_file_name}讀取檔案至fb_comments_dict\n")
 
 
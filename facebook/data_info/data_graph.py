@@ -2,6 +2,10 @@ import json
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 
 # Set the font path for Chinese characters
 font_path = '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc'
@@ -14,11 +18,10 @@ else:
 
 def main():
     # Path to the JSON file
-    json_file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'facebook_comments_by_keyword.json')
+    json_file_path = CORPUS_FILE
     
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_comments_by_keyword("facebook")
     except FileNotFoundError:
         print(f"Error: File not found at {json_file_path}")
         return
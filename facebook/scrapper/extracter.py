@@ -1,8 +1,46 @@
 '''從scraped_unprocessed_raw_data抽出回覆本身'''
 import pandas as pd
-import re
 import os
 import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# ================= 設定區 =================
+INPUT_FOLDER = "scraped_unprocessed_raw_data"
+OUTPUT_FOLDER = "scraped_cleansed_raw_data"
+WORKERS = None  # 同時處理幾個檔案 (None = CPU 核心數)
+# =========================================
+
+
+def clean_facebook_comments(df):
+    """
+    整欄一次處理 (pandas str accessor)，不逐列 iterrows
+    每則留言的 content 以換行分隔：
+        [頭號粉絲] / 用戶名稱 / 留言內容... / 留言時間 / 讚 / 回覆 [/ 已編輯]
+    """
+    lines = df['content'].astype(str).str.split('\n')
+
+    ############
+    # username
+    ############
+
+    # 頭號粉絲：第二行才是用戶名稱；一般粉絲：第一行
+    is_top_fan = lines.str[0] == "頭號粉絲"
+    user_name = lines.str[0].where(~is_top_fan, lines.str[1])
+    rest = lines.str[1:].where(~is_top_fan, lines.str[2:])
+
+    # 已編輯留言：最後多一行「已編輯」
+    is_edited = lines.str[-1] == "已編輯"
+    comment_time = lines.str[-3].where(~is_edited, lines.str[-4])
+    comment_content = rest.str[:-3].where(~is_edited, rest.str[:-4]).str.join("\n")
+
+    return pd.DataFrame({
+        'comment_id': df.index + 1,
+        '用戶名稱': user_name,
+        '留言內容': comment_content,
+        '留言時間': comment_time,
+    })
+
 
 def process_single_facebook_csv(input_file, output_file):
     """
@@ -13,98 +51,58 @@ def process_single_facebook_csv(input_file, output_file):
     except Exception as e:
         print(f"讀取檔案 {input_file} 時發生錯誤: {e}")
         return None
-    
-    processed_data = []
-    
-    for index, row in df.iterrows():
-        content = str(row['content'])
-        
-        lines = content.split('\n')
-
-        ############
-        # username
-        ############
-
-        # 頭號粉絲
-        if lines[0] == "頭號粉絲":
-            user_name = lines[1]
-            comment_index = 2
-        
-        # 一般粉絲
-        else:
-            user_name = lines[0]
-            comment_index = 1
-
-
-        comment_start_index = comment_index
-        comment_end_index = 0
-        time_index = 0
-
-        '''i = -1
-        while (True):
-            if lines[i] == "讚":
-                time_index = i - 1
-                comment_end_index = i - 1
-                break'''
-        
-        comment_time = lines[time_index]
-        comment_content = lines[comment_start_index:comment_end_index]
-
-        # 已編輯留言
-        if lines[-1] == "已編輯":
-            comment_time = lines[-4]
-            comment_content = lines[comment_index:-4]
-
-        # 正常留言
-        else:
-            comment_time = lines[-3]
-            comment_content = lines[comment_index:-3]
-            
-        processed_data.append({
-            'comment_id': index + 1,
-            '用戶名稱': user_name,
-            '留言內容': "\n".join(comment_content),
-            '留言時間': comment_time
-        })
-    
-    new_df = pd.DataFrame(processed_data)
+
+    new_df = clean_facebook_comments(df)
     new_df.to_csv(output_file, index=False, encoding='utf-8-sig')
-    
+
     return new_df
 
-def process_multiple_files(input_folder, output_folder):
+
+def _process_file(args):
+    # 給 ProcessPoolExecutor 使用，只回傳筆數，避免把整個 DataFrame 傳回主程序
+    input_file, output_file = args
+    processed_df = process_single_facebook_csv(input_file, output_file)
+    return None if processed_df is None else len(processed_df)
+
+
+def process_multiple_files(input_folder=INPUT_FOLDER, output_folder=OUTPUT_FOLDER, workers=WORKERS):
     """
-    處理資料夾中的所有CSV檔案
+    處理資料夾中的所有CSV檔案，多個檔案以多程序同時處理
+    回傳 {檔名: 筆數 (讀取失敗為 None)}
     """
     # 建立輸出資料夾
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    
+    os.makedirs(output_folder, exist_ok=True)
+
     # 尋找所有CSV檔案
-    csv_files = glob.glob(os.path.join(input_folder, "*.csv"))
-    
+    csv_files = sorted(glob.glob(os.path.join(input_folder, "*.csv")))
+
     print(f"找到 {len(csv_files)} 個CSV檔案")
-    
-    for csv_file in csv_files:
-        file_name = os.path.basename(csv_file)
-        output_file = os.path.join(output_folder, f"{file_name}")
-        
-        print(f"處理檔案: {file_name}")
-        
-        processed_df = process_single_facebook_csv(csv_file, output_file)
-        
-        if processed_df is not None:
-            print(f"  成功處理 {len(processed_df)} 筆留言")
-    
+
+    jobs = [(csv_file, os.path.join(output_folder, os.path.basename(csv_file))) for csv_file in csv_files]
+    results = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for (csv_file, _), count in zip(jobs, executor.map(_process_file, jobs)):
+            file_name = os.path.basename(csv_file)
+            results[file_name] = count
+            print(f"處理檔案: {file_name}")
+            if count is not None:
+                print(f"  成功處理 {count} 筆留言")
+
     print("\n所有檔案處理完成！")
+    return results
 
-'''# 使用範例
+
+# 使用範例
 if __name__ == "__main__":
     # 單一檔案處理
     # process_single_facebook_csv("facebook_comments.csv", "processed_comments.csv")
-    
-    # 多檔案處理'''
-process_multiple_files("C:\\大學\\大三上\\文字探勘初論\\期末報告Git\\TM_Final_Project-Draft_Dodgers\\raw_data\\facebook\\scraper_code\\scraped_unprocessed_raw_data", "C:\\大學\\大三上\\文字探勘初論\\期末報告Git\\TM_Final_Project-Draft_Dodgers\\raw_data\\facebook\\scraped_cleansed_raw_data")
-
 
+    # 多檔案處理
+    parser = argparse.ArgumentParser(description="清理 Facebook 爬蟲輸出的留言 CSV")
+    parser.add_argument("input_folder", nargs="?", default=INPUT_FOLDER, help="原始 CSV 資料夾 (預設: %(default)s)")
+    parser.add_argument("output_folder", nargs="?", default=OUTPUT_FOLDER, help="輸出資料夾 (預設: %(default)s)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="同時處理的檔案數 (預設: CPU 核心數)")
+    args = parser.parse_args()
 
+    process_multiple_files(args.input_folder, args.output_folder, args.workers)
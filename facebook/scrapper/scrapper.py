@@ -1,35 +1,49 @@
+import os
+import sys
 import time
 import csv
 import hashlib
-from selenium import webdriver
+import argparse
+from collections import OrderedDict
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.replay import save_snapshot
+from common.driver_factory import make_driver, block_resources
+from common.page_waits import mark_page, wait_for_quiet
 
-# ------------------------------------------------
-# 啟動 Selenium
-# ------------------------------------------------
-options = webdriver.ChromeOptions()
-options.add_argument("--disable-notifications")
-driver = webdriver.Chrome(options=options)
 
 # ------------------------------------------------
-# 進入貼文網址
+# 貼文網址
 # ------------------------------------------------
 POST_URL = "https://www.facebook.com/lefthere036/posts/pfbid02p6akqs7knutGbe96utxdvV5SYNZ41bTyGjUeBiqTN94KLTHXzEKpQWeFfJ9zaCz4l"
-driver.get(POST_URL)
 
-input("登入好請按任意鍵： ")
+# 多篇貼文：每篇輸出到 OUTPUT_DIR/post_<id>.csv，另外全部合併寫入 COMBINED_CSV
+OUTPUT_DIR = "fb_output"
+COMBINED_CSV = "fb_comments_all.csv"
+TABS = 1               # 同時爬幾篇貼文 (每篇一個分頁，共用同一個登入狀態)
+ROUND_INTERVAL = 1.2   # 多分頁模式下，同一個分頁兩次處理之間至少間隔幾秒
+NO_CHANGE_LIMIT = 10   # 連續幾輪沒有展開也沒有變長就視為到底
 
+# 需要在視窗中手動登入，預設不使用無頭模式；資源封鎖照常啟用
+HEADLESS = False
 
-# ------------------------------------------------
-# CSV：初始化
-# ------------------------------------------------
-csv_file = open("fb_comments.csv", "a", newline="", encoding="utf-8-sig")
-csv_writer = csv.writer(csv_file)
-csv_writer.writerow(["comment_id", "author", "content"])
+# 增量擷取：每輪只處理上一輪之後新出現的留言節點 (處理過的節點會在 DOM 上標記)
+INCREMENTAL_EXTRACTION = True
+SEEN_LIMIT = 20000        # 去重複用的 ID 最多保留幾筆 (超過時丟掉最舊的)
+CSV_BATCH_SIZE = 200      # 累積幾筆留言才寫入 CSV
+CSV_FLUSH_INTERVAL = 5.0  # 最久幾秒一定寫入一次
+
+# 批次展開：一次注入 JS 點擊所有看得到的展開按鈕，之後只等待一次頁面穩定
+BULK_EXPAND = True
+# (DOM / 網路閒置的判斷與 dcard 共用 common/page_waits.py)
+EXPAND_SETTLE_TIMEOUT = 8    # 點擊後最多等待幾秒
+
+# 由 main() 初始化；離線重播 (common/benchmark_extractors.py) 時會直接替換
+driver = None
 
 
 # ------------------------------------------------
@@ -39,6 +53,57 @@ def make_hash(text):
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 
+# ------------------------------------------------
+# 有上限的去重複集合：超過上限時丟掉最舊的 ID
+# 增量擷取下舊節點不會再被讀到，只需記住最近的 ID 即可
+# ------------------------------------------------
+class BoundedSeenSet:
+    def __init__(self, maxlen=SEEN_LIMIT):
+        self.maxlen = maxlen
+        self._items = OrderedDict()
+        self.total = 0
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def add(self, item):
+        if item in self._items:
+            return
+        self._items[item] = None
+        self.total += 1
+        if len(self._items) > self.maxlen:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        # 回傳累計加入過的數量，與原本 set 的用法 (統計已收集幾則) 一致
+        return self.total
+
+
+# ------------------------------------------------
+# 批次寫入 CSV：累積到 batch_size 筆或超過 flush_interval 秒才寫入並 flush
+# ------------------------------------------------
+class BatchedCsvWriter:
+    def __init__(self, file, batch_size=CSV_BATCH_SIZE, flush_interval=CSV_FLUSH_INTERVAL):
+        self.file = file
+        self.writer = csv.writer(file)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._last_flush = time.monotonic()
+
+    def writerow(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self.writer.writerows(self._rows)
+            self._rows = []
+        self.file.flush()
+        self._last_flush = time.monotonic()
+
+
 # ------------------------------------------------
 # 找到留言區（Facebook 的留言區並沒有固定 selector，需要等待第一則留言出現）
 # ------------------------------------------------
@@ -121,7 +186,64 @@ def find_comment_section():
 # ------------------------------------------------
 # 展開留言 / 回覆
 # ------------------------------------------------
-def expand_all_buttons():
+# 尋找所有可能的展開按鈕
+EXPAND_BUTTON_SELECTORS = [
+    # 展開回覆
+    "//span[contains(text(), '則回覆')]/ancestor::div[@role='button']",
+    "//span[contains(text(), '条回复')]/ancestor::div[@role='button']",
+
+    # 展開更多留言
+    "//span[contains(text(), '更多留言')]/ancestor::div[@role='button']",
+    "//div[@role='button'][contains(text(), '更多留言')]",
+
+    # 查看之前的留言
+    "//div[@role='button'][contains(text(), '查看之前的留言')]",
+
+    # 查看更多留言/回覆
+    "//span[contains(text(), '查看更多')]/ancestor::div[@role='button']",
+]
+
+# 一次點擊所有「看得到」的展開按鈕：略過隱藏節點與「隱藏/收起回覆」(避免反覆展開又收起)
+# 「查看更多留言」等分頁按鈕載入後常是同一個節點，因此不標記已點過，每輪都可以再點
+# 回傳點擊數
+_BULK_EXPAND_JS = """
+var snap = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var collapse = /隱藏|收起|隐藏|Hide/i;
+var clicked = 0;
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var el = snap.snapshotItem(i);
+    if (!el.getClientRects().length || el.offsetParent === null) continue;
+    if (collapse.test(el.innerText || '')) continue;
+    try { el.click(); clicked++; } catch (e) {}
+}
+return clicked;
+"""
+
+# 累計展開統計 (按鈕數、秒數)，用於記錄每秒處理幾個展開按鈕
+expand_stats = {"buttons": 0, "seconds": 0.0}
+
+
+def expand_all_buttons_bulk(wait=True):
+    start = time.monotonic()
+    since = mark_page(driver)
+    clicked = driver.execute_script(_BULK_EXPAND_JS, " | ".join(EXPAND_BUTTON_SELECTORS))
+    if not clicked:
+        return False
+
+    # 多分頁模式下不在這裡等待，改為輪到其他分頁時讓這個分頁自行載入
+    settled = wait_for_quiet(driver, since, "expand", timeout=EXPAND_SETTLE_TIMEOUT) if wait else True
+    elapsed = time.monotonic() - start
+    expand_stats["buttons"] += clicked
+    expand_stats["seconds"] += elapsed
+    print(f"clicked {clicked} buttons in {elapsed:.2f}s ({clicked / elapsed:.1f} 個/秒)"
+          + ("" if settled else "，等待逾時"))
+    return True
+
+
+def expand_all_buttons(wait=True):
+    if BULK_EXPAND:
+        return expand_all_buttons_bulk(wait)
+
     '''changed = False
 
     # 所有可能的展開按鈕文字（繁中 + 英文）
@@ -146,24 +268,9 @@ def expand_all_buttons():
     return changed'''
     changed = False
 
-    # 尋找所有可能的展開按鈕
-    button_selectors = [
-        # 展開回覆
-        "//span[contains(text(), '則回覆')]/ancestor::div[@role='button']",
-        "//span[contains(text(), '条回复')]/ancestor::div[@role='button']",
-
-        # 展開更多留言
-        "//span[contains(text(), '更多留言')]/ancestor::div[@role='button']",
-        "//div[@role='button'][contains(text(), '更多留言')]",
-
-        # 查看之前的留言
-        "//div[@role='button'][contains(text(), '查看之前的留言')]",
-
-        # 查看更多留言/回覆
-        "//span[contains(text(), '查看更多')]/ancestor::div[@role='button']",
-    ]
-    
-    buttons = driver.find_elements(By.XPATH, " | ".join(button_selectors))
+    start = time.monotonic()
+    clicked = 0
+    buttons = driver.find_elements(By.XPATH, " | ".join(EXPAND_BUTTON_SELECTORS))
     for btn in buttons:
         try:
             driver.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
@@ -172,8 +279,11 @@ def expand_all_buttons():
             print("clicked button")
             time.sleep(1.5)
             changed = True
+            clicked += 1
         except:
             pass
+    expand_stats["buttons"] += clicked
+    expand_stats["seconds"] += time.monotonic() - start
     return changed
 
 
@@ -192,7 +302,56 @@ def scroll_page():
 # ------------------------------------------------
 # 提取留言（邊讀邊寫 CSV）
 # ------------------------------------------------
-def extract_comments(seen):
+# 只取尚未標記的留言節點，並在同一段 JS 內讀出 permalink、作者與全文後加上標記
+# 回傳 [[permalink 或 null, 作者, 全文], ...]
+_NEW_COMMENTS_JS = """
+var snap = document.evaluate("//div[@role='article' and .//div[@dir='auto'] and not(@data-scraped)]",
+                             document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var out = [];
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var node = snap.snapshotItem(i);
+    var text = (node.innerText || '').trim();
+    if (!text) continue;  // 內容還沒載入，下一輪再處理
+    node.setAttribute('data-scraped', '1');
+    var link = node.querySelector("a[href*='comment_id']");
+    var author = node.querySelector('strong span');
+    out.push([link ? link.href : null, author ? author.innerText : '', text]);
+}
+return out;
+"""
+
+
+def reset_extraction_marks():
+    """
+    清除增量擷取留在 DOM 上的標記 (離線重播重複測速時使用)
+    """
+    driver.execute_script("document.querySelectorAll('[data-scraped]').forEach(function (n) { n.removeAttribute('data-scraped'); });")
+
+
+def extract_new_comments(seen, writer):
+    """
+    增量擷取：只處理上一輪之後新出現的留言節點，每輪成本不隨已載入的留言數增加
+    """
+    for permalink, author, text_block in driver.execute_script(_NEW_COMMENTS_JS):
+        cid = permalink or make_hash(text_block)
+        if cid in seen:
+            continue
+        seen.add(cid)
+
+        # 抓內容（移除作者）
+        content = text_block.replace(author, "").strip()
+
+        writer.writerow([cid, author, content])
+        print("✔ 已寫入留言：", content[:30])
+
+
+def extract_comments(seen, writer):
+    """
+    擷取目前頁面上的留言，新留言以 writer.writerow([id, 作者, 內容]) 寫出
+    """
+    if INCREMENTAL_EXTRACTION:
+        return extract_new_comments(seen, writer)
+
     comments = driver.find_elements(
         By.XPATH,
         "//div[@role='article' and .//div[@dir='auto']]"
@@ -227,7 +386,7 @@ def extract_comments(seen):
             # 抓內容（移除作者）
             content = text_block.replace(author, "").strip()
 
-            csv_writer.writerow([cid, author, content])
+            writer.writerow([cid, author, content])
             print("✔ 已寫入留言：", content[:30])
 
         except Exception as e:
@@ -237,8 +396,9 @@ def extract_comments(seen):
 # ------------------------------------------------
 # 控制整體流程
 # ------------------------------------------------
-def navigate_comment_section():
-    seen = set()
+def navigate_comment_section(writer, seen=None):
+    if seen is None:
+        seen = BoundedSeenSet()
 
     no_change_count = 0
 
@@ -247,7 +407,7 @@ def navigate_comment_section():
         expanded = expand_all_buttons()
 
         print("➡ 提取留言…")
-        extract_comments(seen)
+        extract_comments(seen, writer)
 
         print("➡ 滾動頁面…")
         scrolled = scroll_page()
@@ -263,18 +423,208 @@ def navigate_comment_section():
             no_change_count = 0
             print("no change count refreshed")
 
-        if no_change_count >= 10:
+        if no_change_count >= NO_CHANGE_LIMIT:
             print("✔ 已到底部，停止")
             break
 
 
+# ------------------------------------------------
+# 多篇貼文：每篇寫入自己的 CSV，同時附上貼文網址寫入合併的 CSV
+# ------------------------------------------------
+class PostWriter:
+    def __init__(self, post_url, combined):
+        self.post_url = post_url
+        self.path = os.path.join(OUTPUT_DIR, f"post_{make_hash(post_url)[:10]}.csv")
+        self.count = 0
+        self._file = open(self.path, "w", newline="", encoding="utf-8-sig")
+        self._own = BatchedCsvWriter(self._file)
+        self._own.writerow(["comment_id", "author", "content"])
+        self._combined = combined
+
+    def writerow(self, row):
+        self._own.writerow(row)
+        self._combined.writerow([self.post_url] + row)
+        self.count += 1
+
+    def flush(self):
+        self._own.flush()
+        self._combined.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+class PostTask:
+    """
+    一篇貼文的爬取狀態；多分頁模式下每個分頁對應一個 PostTask
+    """
+
+    def __init__(self, post_url, combined):
+        self.post_url = post_url
+        self.writer = PostWriter(post_url, combined)
+        self.seen = BoundedSeenSet()
+        self.handle = None
+        self.height = 0
+        self.no_change_count = 0
+        self.done = False
+
+
+def open_post(task, new_tab):
+    if new_tab:
+        driver.switch_to.new_window("tab")
+        # 資源封鎖只對下指令時的分頁有效，新分頁要再設定一次
+        block_resources(driver)
+    task.handle = driver.current_window_handle
+    driver.get(task.post_url)
+
+
+def finish_post(task):
+    task.writer.close()
+    save_snapshot(driver, "facebook", f"post_{make_hash(task.post_url)[:10]}")
+    print(f"✔ {task.post_url}：共 {task.writer.count} 則留言 → {task.writer.path}")
+
+
+def crawl_step(task):
+    """
+    多分頁模式下對一個分頁做一輪「展開 → 擷取 → 滾動」，不在分頁內等待；
+    是否有變化改為和上一輪輪到這個分頁時比較
+    """
+    driver.switch_to.window(task.handle)
+
+    expanded = expand_all_buttons(wait=False)
+    extract_comments(task.seen, task.writer)
+
+    height = driver.execute_script("return document.body.scrollHeight")
+    grew = height > task.height
+    task.height = height
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+    if expanded or grew:
+        task.no_change_count = 0
+    else:
+        task.no_change_count += 1
+    task.done = task.no_change_count >= NO_CHANGE_LIMIT
+
+
+def crawl_posts_sequential(urls, combined):
+    for url in urls:
+        task = PostTask(url, combined)
+        open_post(task, new_tab=False)
+        find_comment_section()
+        try:
+            navigate_comment_section(task.writer, task.seen)
+        finally:
+            finish_post(task)
+
+
+def crawl_posts_in_tabs(urls, combined, tabs):
+    """
+    同時開 tabs 個分頁輪流處理；一個分頁在載入時，其他分頁繼續展開與擷取
+    某篇爬完就關掉分頁，換下一篇補上
+    """
+    pending = list(urls)
+    active = []
+    home = driver.current_window_handle
+
+    try:
+        while pending or active:
+            while pending and len(active) < tabs:
+                task = PostTask(pending.pop(0), combined)
+                active.append(task)
+                open_post(task, new_tab=True)
+
+            round_start = time.monotonic()
+            for task in list(active):
+                try:
+                    crawl_step(task)
+                except Exception as e:
+                    print(f"⚠️  {task.post_url} 發生錯誤，停止此篇：{e}")
+                    task.done = True
+                if task.done:
+                    active.remove(task)
+                    finish_post(task)
+                    driver.switch_to.window(task.handle)
+                    driver.close()
+
+            driver.switch_to.window(home)
+            rest = ROUND_INTERVAL - (time.monotonic() - round_start)
+            if active and rest > 0:
+                time.sleep(rest)
+    finally:
+        # 中斷 (Ctrl+C) 或其他錯誤時，仍在進行中的貼文也要把緩衝的留言寫出
+        for task in active:
+            try:
+                if task.handle:
+                    driver.switch_to.window(task.handle)
+                finish_post(task)
+            except Exception as e:
+                task.writer.close()
+                print(f"⚠️  {task.post_url} 收尾時發生錯誤：{e}")
+
+
+def crawl_posts(urls, tabs=TABS):
+    """
+    用同一個登入狀態爬多篇貼文
+    tabs=1 時逐篇在同一個分頁處理；大於 1 時同時開多個分頁輪流處理
+    """
+    global driver
+
+    # 啟動 Selenium
+    driver = make_driver(headless=HEADLESS)
+
+    # 只需登入一次，之後的貼文共用同一個 session
+    driver.get(urls[0])
+    input("登入好請按任意鍵： ")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    # CSV：初始化
+    is_new = not os.path.exists(COMBINED_CSV)
+    csv_file = open(COMBINED_CSV, "a", newline="", encoding="utf-8-sig")
+    combined = BatchedCsvWriter(csv_file)
+    if is_new:
+        combined.writerow(["post_url", "comment_id", "author", "content"])
+        combined.flush()
+
+    try:
+        if tabs > 1:
+            crawl_posts_in_tabs(urls, combined, tabs)
+        else:
+            crawl_posts_sequential(urls, combined)
+    finally:
+        combined.flush()
+        csv_file.close()
+        driver.quit()
+
+    if expand_stats["seconds"]:
+        print(f"⏱️  共展開 {expand_stats['buttons']} 個按鈕，耗時 {expand_stats['seconds']:.1f} 秒 "
+              f"({expand_stats['buttons'] / expand_stats['seconds']:.1f} 個/秒)")
+
+    print(f"🎉 完成！{len(urls)} 篇貼文的留言已寫入 {OUTPUT_DIR}/ 與 {COMBINED_CSV}")
+
+
+def read_url_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
 # ------------------------------------------------
 # 主流程
 # ------------------------------------------------
-comment_section = find_comment_section()
-navigate_comment_section()
+def main(urls=None, tabs=TABS):
+    crawl_posts(urls or [POST_URL], tabs=tabs)
+
 
-csv_file.close()
-driver.quit()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Facebook 貼文留言爬蟲")
+    parser.add_argument("urls", nargs="*", help="貼文網址 (預設: POST_URL)")
+    parser.add_argument("--url-file", help="貼文網址清單檔，每行一個網址")
+    parser.add_argument("--tabs", type=int, default=TABS, help="同時開幾個分頁 (預設: %(default)s)")
+    args = parser.parse_args()
 
-print("🎉 完成！留言已寫入 fb_comments.csv")
+    urls = list(args.urls)
+    if args.url_file:
+        urls += read_url_file(args.url_file)
+    main(urls, tabs=args.tabs)
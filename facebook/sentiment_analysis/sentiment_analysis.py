@@ -0,0 +1,123 @@
+import os
+import argparse
+
+import json
+import torch
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
+from common.sentiment_engine import MODEL_NAME, BACKENDS, SentimentCache, analyze_corpus, load_pipeline, cache_model_key
+
+def main(args):
+    # Check for GPU
+    device = 0 if torch.cuda.is_available() else -1
+    print(f"Using device: {device}")
+
+    # Input and Output files
+    input_file = CORPUS_FILE
+    output_file = 'facebook_sentiment_by_keyword.json'
+
+    # Load data
+    print(f"Loading data from {input_file}...")
+    try:
+        # pipeline 需要 list，每個關鍵字的留言先轉成 list
+        data = {keyword: list(comments) for keyword, comments in load_comments_by_keyword("facebook").items()}
+    except FileNotFoundError as e:
+        print(e)
+        return
+
+    # Model name
+    model_name = MODEL_NAME
+
+    print(f"Loading model: {model_name} ({args.backend})...")
+    try:
+        # 多程序模式下模型只在各 worker 中載入
+        sentiment_pipeline = load_pipeline(args.backend, device, model_name) if args.workers <= 1 else None
+    except Exception as e:
+        print(f"Failed to load model: {e}")
+        import traceback
+        traceback.print_exc()
+        return
+
+    print("Starting sentiment analysis...")
+
+    # 已推論過的留言直接從快取取得結果
+    cache = None if args.no_cache else SentimentCache(model=cache_model_key(args.backend, model_name))
+
+    # 所有關鍵字的留言合併去重複後一起推論，再依原本的關鍵字與順序展開
+    results = analyze_corpus(data, sentiment_pipeline, cache, dynamic=args.batching == "dynamic",
+                             workers=args.workers, threads=args.threads, backend=args.backend,
+                             model_name=model_name) # {keyword: [ {comment, sentiment, score}, ... ]}
+
+    if cache is not None:
+        print(cache.summary())
+        cache.close()
+
+    # Save
+    print(f"Saving results to {output_file}...")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    
+    # Print summary and save to file
+    summary_file = 'facebook_sentiment_summary.txt'
+    print(f"Saving summary to {summary_file}...")
+    
+    with open(summary_file, 'w', encoding='utf-8') as f_summary:
+        sentiment_counts = {"正面": 0, "中性": 0, "負面": 0}
+        keyword_stats = {} # {keyword: {"正面": 0, "中性": 0, "負面": 0, "total": 0}}
+
+        total_comments = 0
+        for keyword, comments_data in results.items():
+            if keyword not in keyword_stats:
+                keyword_stats[keyword] = {"正面": 0, "中性": 0, "負面": 0, "total": 0}
+
+            for item in comments_data:
+                s = item.get('sentiment')
+                
+                # Global stats
+                if s in sentiment_counts:
+                    sentiment_counts[s] += 1
+                total_comments += 1
+                
+                # Keyword stats
+                if s in keyword_stats[keyword]:
+                    keyword_stats[keyword][s] += 1
+                keyword_stats[keyword]["total"] += 1
+                
+        # Helper to print to both console and file
+        def print_both(text):
+            print(text)
+            f_summary.write(text + "\n")
+
+        print_both("\nSentiment Analysis Summary:")
+        print_both(f"Total comments processed: {total_comments}")
+        for k, v in sentiment_counts.items():
+            print_both(f"{k}: {v}")
+
+        print_both("\nSentiment Distribution by Keyword:")
+        print_both(f"{'Keyword':<15} | {'Positive':<10} | {'Neutral':<10} | {'Negative':<10} | {'Total':<8}")
+        print_both("-" * 65)
+        
+        for keyword, stats in keyword_stats.items():
+            total = stats["total"]
+            if total > 0:
+                pos_pct = (stats["正面"] / total) * 100
+                neu_pct = (stats["中性"] / total) * 100
+                neg_pct = (stats["負面"] / total) * 100
+                print_both(f"{keyword:<15} | {pos_pct:>6.1f}%   | {neu_pct:>6.1f}%   | {neg_pct:>6.1f}%   | {total:>8}")
+            else:
+                print_both(f"{keyword:<15} | {'N/A':>8} | {'N/A':>8} | {'N/A':>8} | {total:>8}")
+
+    print("Done.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Facebook 留言情感分析")
+    parser.add_argument("--no-cache", action="store_true", help="不使用情感分析快取，全部重新推論")
+    parser.add_argument("--batching", choices=["dynamic", "fixed"], default="dynamic",
+                        help="dynamic: 依 token 長度分批；fixed: 依原順序每 8 則一批 (預設: %(default)s)")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch",
+                        help="推論後端：pytorch / int8 (動態量化，CPU) / onnx (onnxruntime，CPU) (預設: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="CPU 多程序推論的程序數 (預設: %(default)s)")
+    parser.add_argument("--threads", type=int, default=None, help="每個程序的 torch 執行緒數 (預設: CPU 核心數 / 程序數)")
+    main(parser.parse_args())
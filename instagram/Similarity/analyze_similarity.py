@@ -10,15 +10,18 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 
 
 # In[7]:
 
 
 # Load data
-input_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instagram_comments_by_keyword.json')
-with open(input_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+input_file = CORPUS_FILE
+data = load_comments_by_keyword("instagram")
 
 results = {}
 
@@ -14,6 +14,10 @@ import os
 import torch
 import re
 from sklearn.feature_extraction.text import CountVectorizer
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from common.corpus import load_comments_by_keyword, CORPUS_FILE
 
 
 # In[2]:
@@ -47,11 +51,10 @@ def clean_text(text):
 # Read data
 ##############
 
-input_file_name = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "instagram_comments_by_keyword.json")
+input_file_name = CORPUS_FILE
 platform_name = "ig"
 
-with open(input_file_name, "r", encoding="utf-8") as f:
-    comments_dict = json.load(f)
+comments_dict = load_comments_by_keyword("instagram")
 print(f"成功從{input_file_name}讀取檔案至comments_dict\n")
 
 
@@ -1,73 +1,139 @@
+'''把 Instagram 留言區直接複製下來的 .txt 轉成 CSV (username, comments, time)
+
+可一次處理多個檔案 (支援萬用字元)，逐行讀取、邊讀邊寫，不會把整個檔案載入記憶體：
+    python scraper_extracter.py "廖允杰*.txt"               # 每個 txt 各輸出一個同名 csv
+    python scraper_extracter.py "*.txt" -o all_comments.csv  # 合併輸出，多一欄 source
+'''
+import os
 import csv
 import re
+import glob
+import argparse
 
 input_file = "廖允杰3.txt"    # 你的txt檔名
-output_file = "廖允杰3.csv"   # 輸出的csv名稱
+
+FIELDNAMES = ["username", "comments", "time"]
 
 # 判斷是否為時間（如：6週, 3週, 1週, 2天）
-def is_time_line(line):
-    return bool(re.match(r"^\d+\s*(週|天|小時|分鐘)$", line.strip()))
-
-# 判斷是否為 "username的大頭貼照"
-def is_profile_pic_line(line):
-    return "的大頭貼照" in line
-
-rows = []
-current_time = None
-current_comment_lines = []
-current_user = None
-
-with open(input_file, "r", encoding="utf-8") as f:
-    lines = [line.rstrip("\n") for line in f]
-
-i = 0
-while i < len(lines):
-    line = lines[i].strip()
-
-    # 1️⃣ 找到時間（每條留言都從時間開始）
-    if is_time_line(line):
-        # 若上一組資料完整，先存起來
-        if current_time and current_user and current_comment_lines:
-            rows.append({
-                "time": current_time,
-                "comments": "\n".join(current_comment_lines),
-                "username": current_user
-            })
-
-        # 開始新的留言
-        current_time = line
-        current_comment_lines = []
-        current_user = None
-        i += 1
-        continue
-
-    # 2️⃣ 找到「xxx的大頭貼照」=留言結束
-    if is_profile_pic_line(line):
-        # 下一行就是 username
-        if i + 1 < len(lines):
-            current_user = lines[i + 1].strip()
-            i += 2
+TIME_LINE = re.compile(r"^\d+\s*(週|天|小時|分鐘)$")
+# "username的大頭貼照" 這一行的下一行是 username
+PROFILE_PIC_MARK = "的大頭貼照"
+
+
+def parse_comments(lines):
+    """
+    逐行解析，每湊滿一則留言就 yield {"username", "comments", "time"}
+    lines 可以是任何可迭代的字串 (例如開啟的檔案)
+    """
+    current_time = None
+    current_comment_lines = []
+    current_user = None
+    profile_line = None  # 上一行是「xxx的大頭貼照」，這一行就是 username
+
+    for raw in lines:
+        line = raw.rstrip("\n").strip()
+
+        if profile_line is not None:
+            current_user = line
+            profile_line = None
+            continue
+
+        # 1️⃣ 找到時間（每條留言都從時間開始）
+        if TIME_LINE.match(line):
+            # 若上一組資料完整，先輸出
+            if current_time and current_user and current_comment_lines:
+                yield {"username": current_user, "comments": "\n".join(current_comment_lines), "time": current_time}
+
+            # 開始新的留言
+            current_time = line
+            current_comment_lines = []
+            current_user = None
+            continue
+
+        # 2️⃣ 找到「xxx的大頭貼照」=留言結束，下一行就是 username
+        if PROFILE_PIC_MARK in line:
+            profile_line = line
             continue
 
-    # 3️⃣ 其他都視為留言內容（可能多行）
-    if line.strip() != "":
-        current_comment_lines.append(line)
+        # 3️⃣ 其他都視為留言內容（可能多行）
+        if line:
+            current_comment_lines.append(line)
+
+    # 檔案最後一行是「xxx的大頭貼照」時沒有 username，當作一般內容
+    if profile_line is not None:
+        current_comment_lines.append(profile_line)
+
+    # 4️⃣ 處理最後一筆（因為沒有下一筆時間觸發輸出）
+    if current_time and current_user and current_comment_lines:
+        yield {"username": current_user, "comments": "\n".join(current_comment_lines), "time": current_time}
+
+
+def expand_inputs(patterns):
+    """
+    展開萬用字元並去除重複，保持輸入順序
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def iter_comment_rows(patterns):
+    """
+    依序解析所有輸入檔，yield (檔案路徑, 留言)
+    """
+    for path in expand_inputs(patterns):
+        with open(path, "r", encoding="utf-8") as f:
+            for row in parse_comments(f):
+                yield path, row
+
+
+def extract_to_csv(patterns, output_file):
+    """
+    把所有輸入檔合併寫成一個 CSV (多一欄 source 記錄來源檔名)，回傳寫入筆數
+    """
+    count = 0
+    with open(output_file, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=["source"] + FIELDNAMES)
+        writer.writeheader()
+        for path, row in iter_comment_rows(patterns):
+            row["source"] = os.path.basename(path)
+            writer.writerow(row)
+            count += 1
+    return count
+
 
-    i += 1
+def extract_file(input_path, output_path=None):
+    """
+    單一 txt 轉成 CSV (預設輸出為同名 .csv)，回傳寫入筆數
+    """
+    output_path = output_path or os.path.splitext(input_path)[0] + ".csv"
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as f, \
+            open(output_path, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for row in parse_comments(f):
+            writer.writerow(row)
+            count += 1
+    return count
 
-# 4️⃣ 處理最後一筆（因為沒有下一筆時間觸發 append）
-if current_time and current_user and current_comment_lines:
-    rows.append({
-        "time": current_time,
-        "comments": "\n".join(current_comment_lines),
-        "username": current_user
-    })
 
-# 5️⃣ 輸出 CSV
-with open(output_file, "w", encoding="utf-8", newline="") as csvfile:
-    writer = csv.DictWriter(csvfile, fieldnames=["username", "comments", "time"])
-    writer.writeheader()
-    for row in rows:
-        writer.writerow(row)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 Instagram 留言 txt 轉成 CSV")
+    parser.add_argument("inputs", nargs="*", default=[input_file], help="txt 檔案，可用萬用字元 (預設: %(default)s)")
+    parser.add_argument("-o", "--output", help="合併輸出到單一 CSV；未指定時每個 txt 各輸出一個同名 csv")
+    args = parser.parse_args()
 
-print(f"已成功輸出 CSV：{output_file}")
+    # 5️⃣ 輸出 CSV
+    if args.output:
+        n = extract_to_csv(args.inputs, args.output)
+        print(f"已成功輸出 CSV：{args.output} ({n} 筆)")
+    else:
+        for path in expand_inputs(args.inputs):
+            output_path = os.path.splitext(path)[0] + ".csv"
+            n = extract_file(path, output_path)
+            print(f"已成功輸出 CSV：{output_path} ({n} 筆)")
@@ -1,47 +1,115 @@
+import os
+import sys
 import time
 import csv
 import hashlib
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, ElementClickInterceptedException
+from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, ElementClickInterceptedException, WebDriverException
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.replay import save_snapshot
+from common.driver_factory import make_driver
 
 # ----------------------------
 # 參數（修改成你的 IG 帖文）
 # ----------------------------
 POST_URL = "https://www.instagram.com/hsieh_kunda/p/DPk1EhDgZc1/"   # ← 改成目標 IG 帖文
 
-# ----------------------------
-# 啟動 Selenium
-# ----------------------------
-options = webdriver.ChromeOptions()
-options.add_argument("--disable-notifications")
-options.add_argument("--lang=en")  # 設定語言為英文，避免按鈕文字不同
-driver = webdriver.Chrome(options=options)
-driver.get(POST_URL)
+# 可能需要在視窗中手動登入，預設不使用無頭模式；資源封鎖照常啟用
+HEADLESS = False
 
-# 等待頁面加載
-time.sleep(5)
+# 精準擷取：在頁面內一次找出所有留言項目並回傳 (id, 作者, 內容)，
+# 設為 False 改用原本逐一比對 span 的方式
+TARGETED_EXTRACTION = True
 
-# 先檢查是否在登入頁面
-try:
-    # 檢查是否有登入表單
-    driver.find_element(By.XPATH, "//input[@name='username']")
-    print("請先手動登入 Instagram...")
-    input("登入完成後按 Enter 繼續： ")
-except:
-    print("已登入或非登入頁面，繼續執行...")
-    time.sleep(2)
+# 由 main() 初始化；離線重播 (common/benchmark_extractors.py) 時會直接替換
+driver = None
+csv_file = None
+csv_writer = None
+
+def make_hash(text):
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 # ----------------------------
-# CSV 初始化
+# 精準留言擷取：每則留言 (含貼文說明) 都有一個作者連結和一個 <time>，
+# 以 <time> 為起點往上找「只包含這一個 <time>」的最大容器，即為一則留言
+# 回傳 [[留言 permalink 或 null, 作者, 內容], ...]
 # ----------------------------
-csv_file = open("ig_comments.csv", "w", newline="", encoding="utf-8-sig")  # 改為 "w" 模式
-csv_writer = csv.writer(csv_file)
-csv_writer.writerow(["comment_id", "author", "content"])
-csv_file.flush()
+_COMMENT_ITEMS_JS = """
+var root = document.querySelector("div[role='dialog']") || document.querySelector('main') || document.body;
+var times = root.querySelectorAll('time');
+// 每個祖先包含幾個 <time>：只需要分辨 1 和 2 以上；往上遇到已經是 2 的節點就停，整體是線性的
+var timeCount = new Map();
+for (var i = 0; i < times.length; i++) {
+    var p = times[i].parentElement;
+    while (p && p !== root && timeCount.get(p) !== 2) {
+        timeCount.set(p, timeCount.has(p) ? 2 : 1);
+        p = p.parentElement;
+    }
+}
+var items = [];
+var picked = new Set();
+for (var i = 0; i < times.length; i++) {
+    var item = times[i];
+    while (item.parentElement && item.parentElement !== root && timeCount.get(item.parentElement) === 1) {
+        item = item.parentElement;
+    }
+    if (!picked.has(item)) {
+        picked.add(item);
+        items.push(item);
+    }
+}
+
+var out = [];
+for (var i = 0; i < items.length; i++) {
+    var item = items[i];
+    var author = '';
+    var links = item.querySelectorAll("a[href^='/']");
+    for (var j = 0; j < links.length; j++) {
+        var name = (links[j].innerText || '').trim();
+        if (name && links[j].getAttribute('href').indexOf('/p/') === -1) { author = name; break; }
+    }
+    var permalink = item.querySelector("a[href*='/c/']");
+
+    // 內容：不在連結、按鈕或時間裡的 span[dir=auto]
+    var text = '';
+    var spans = item.querySelectorAll("span[dir='auto']");
+    for (var j = 0; j < spans.length; j++) {
+        if (spans[j].closest("a, button, [role='button'], time")) continue;
+        var t = (spans[j].innerText || '').trim();
+        if (t && t !== author) { text = t; break; }
+    }
+    if (text) out.push([permalink ? permalink.href : null, author, text]);
+}
+return out;
+"""
+
+
+def extract_comments_targeted(seen):
+    """
+    一次 execute_script 取回目前頁面上所有留言，不再逐一對每個 span 呼叫 WebDriver
+    """
+    try:
+        items = driver.execute_script(_COMMENT_ITEMS_JS)
+    except WebDriverException as e:
+        # 例如頁面正在切換時 JS 執行失敗，和原本的擷取方式一樣略過這一輪
+        print(f"擷取留言時發生錯誤: {e}")
+        return 0
+
+    new = 0
+    for permalink, author, text in items:
+        cid = make_hash(permalink) if permalink else make_hash(f"{author}:{text}")
+        if cid in seen:
+            continue
+        seen.add(cid)
+        csv_writer.writerow([cid, author, text])
+        new += 1
+        print(f"✔ 找到留言: [{author}] {text[:50]}...")
+
+    if new:
+        csv_file.flush()
+    return len(seen)
 
-def make_hash(text):
-    return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 # ----------------------------
 # 簡化的留言擷取函數
@@ -50,6 +118,9 @@ def extract_comments(seen):
     """
     擷取目前頁面上所有留言
     """
+    if TARGETED_EXTRACTION:
+        return extract_comments_targeted(seen)
+
     try:
         # 方法1：嘗試找留言容器（Instagram 常見的留言結構）
         comments = []
@@ -224,43 +295,74 @@ def scroll_for_comments():
 # ----------------------------
 # 主程式
 # ----------------------------
-try:
-    # 等待頁面完全加載
-    print("等待頁面載入...")
+def main():
+    global driver, csv_file, csv_writer
+
+    # 啟動 Selenium (語言設為英文，避免按鈕文字不同)
+    driver = make_driver(headless=HEADLESS, language="en")
+    driver.get(POST_URL)
+
+    # 等待頁面加載
     time.sleep(5)
-    
-    # 嘗試點開留言區（如果有需要）
+
+    # 先檢查是否在登入頁面
     try:
-        # 點擊留言/評論按鈕
-        comment_buttons = driver.find_elements(By.XPATH,
-            "//span[contains(., 'comment') or contains(., 'Comment') or "
-            "contains(., '評論') or contains(., '留言')]/ancestor::button | "
-            "//button[contains(@aria-label, 'comment') or contains(@aria-label, 'Comment')]"
-        )
-        
-        for btn in comment_buttons:
-            try:
-                btn.click()
-                print("點擊了留言按鈕")
-                time.sleep(3)
-                break
-            except:
-                continue
+        # 檢查是否有登入表單
+        driver.find_element(By.XPATH, "//input[@name='username']")
+        print("請先手動登入 Instagram...")
+        input("登入完成後按 Enter 繼續： ")
     except:
-        print("無法點擊留言按鈕，繼續執行...")
+        print("已登入或非登入頁面，繼續執行...")
+        time.sleep(2)
+
+    # CSV 初始化
+    csv_file = open("ig_comments.csv", "w", newline="", encoding="utf-8-sig")  # 改為 "w" 模式
+    csv_writer = csv.writer(csv_file)
+    csv_writer.writerow(["comment_id", "author", "content"])
+    csv_file.flush()
+
+    try:
+        # 等待頁面完全加載
+        print("等待頁面載入...")
+        time.sleep(5)
     
-    # 開始滾動和擷取
-    all_comments = scroll_for_comments()
+        # 嘗試點開留言區（如果有需要）
+        try:
+            # 點擊留言/評論按鈕
+            comment_buttons = driver.find_elements(By.XPATH,
+                "//span[contains(., 'comment') or contains(., 'Comment') or "
+                "contains(., '評論') or contains(., '留言')]/ancestor::button | "
+                "//button[contains(@aria-label, 'comment') or contains(@aria-label, 'Comment')]"
+            )
+        
+            for btn in comment_buttons:
+                try:
+                    btn.click()
+                    print("點擊了留言按鈕")
+                    time.sleep(3)
+                    break
+                except:
+                    continue
+        except:
+            print("無法點擊留言按鈕，繼續執行...")
+    
+        # 開始滾動和擷取
+        all_comments = scroll_for_comments()
+        save_snapshot(driver, "instagram", "post")
     
-    print(f"\n🎉 完成！總共收集到 {len(all_comments)} 則留言")
+        print(f"\n🎉 完成！總共收集到 {len(all_comments)} 則留言")
     
-except KeyboardInterrupt:
-    print("\n使用者中斷程式")
-except Exception as e:
-    print(f"程式執行錯誤: {e}")
-    import traceback
-    traceback.print_exc()
-finally:
-    csv_file.close()
-    driver.quit()
-    print("程式結束，留言已儲存至 ig_comments.csv")
\ No newline at end of file
+    except KeyboardInterrupt:
+        print("\n使用者中斷程式")
+    except Exception as e:
+        print(f"程式執行錯誤: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        csv_file.close()
+        driver.quit()
+        print("程式結束，留言已儲存至 ig_comments.csv")
+
+
+if __name__ == "__main__":
+    main()
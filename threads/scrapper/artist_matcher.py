@@ -0,0 +1,109 @@
+import csv
+import os
+from collections import deque
+
+
+# =====================================================
+# Aho–Corasick 多關鍵字比對：由 artists.json 建一次自動機，
+# 之後每篇貼文只需掃過一次文字，就能找出提到的所有藝人
+# =====================================================
+class ArtistMatcher:
+    def __init__(self, artist_keywords):
+        # 節點以整數表示：goto[node] = {字元: 下一個節點}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        for artist, keywords in artist_keywords.items():
+            for keyword in keywords:
+                if keyword:
+                    self._add(keyword, artist)
+        self._build_failure_links()
+
+    def _add(self, keyword, artist):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            node = nxt
+        self._output[node].add(artist)
+
+    def _build_failure_links(self):
+        # BFS：每個節點的 fail 指向「目前字串最長的、同時也是某關鍵字前綴的後綴」
+        q = deque(self._goto[0].values())
+        while q:
+            node = q.popleft()
+            for ch, nxt in self._goto[node].items():
+                q.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._output[nxt] |= self._output[self._fail[nxt]]
+
+    def match(self, text):
+        """
+        回傳 text 中提到的所有藝人 (set)
+        """
+        found = set()
+        node = 0
+        for ch in text or "":
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if self._output[node]:
+                found |= self._output[node]
+        return found
+
+
+# =====================================================
+# 邊爬邊寫：每篇貼文爬完就把留言附加到 all_comments.csv 與各藝人的 CSV
+# =====================================================
+COMMENT_FIELDS = ["post_url", "post_text", "comment_author", "comment_time", "comment_text"]
+
+
+class StreamingArtistWriter:
+    def __init__(self, output_dir, artist_keywords):
+        self.output_dir = output_dir
+        self.matcher = ArtistMatcher(artist_keywords)
+        self.counts = {artist: 0 for artist in artist_keywords}
+        self.total = 0
+
+        self._files = []
+        self._all_writer = self._open(os.path.join(output_dir, "all_comments.csv"))
+        self._artist_writers = {
+            artist: self._open(os.path.join(output_dir, f"{artist}.csv"))
+            for artist in artist_keywords
+        }
+
+    def _open(self, path):
+        f = open(path, "w", newline="", encoding="utf-8-sig")
+        self._files.append(f)
+        writer = csv.DictWriter(f, fieldnames=COMMENT_FIELDS)
+        writer.writeheader()
+        return writer
+
+    def write_post(self, post):
+        """
+        依「貼文主文」決定這篇貼文要分給哪些藝人（一篇可以分給多個藝人），
+        並立即把該貼文的所有留言寫入對應的 CSV
+        """
+        comments = post["comments"]
+        self._all_writer.writerows(comments)
+        self.total += len(comments)
+
+        for artist in self.matcher.match(post["post_text"] or ""):
+            self._artist_writers[artist].writerows(comments)
+            self.counts[artist] += len(comments)
+
+        for f in self._files:
+            f.flush()
+
+    def close(self):
+        for f in self._files:
+            f.close()
@@ -2,25 +2,32 @@ import time
 import json
 import os
 import re
-import pandas as pd
+import sys
+import queue
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.options import Options
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.replay import save_snapshot
+from common.driver_factory import make_driver
+from artist_matcher import StreamingArtistWriter
+
+# 需要在視窗中手動登入，預設不使用無頭模式；資源封鎖照常啟用
+HEADLESS = False
+
+# 平行爬取：登入後匯出 cookies，複製到 CONCURRENCY 個瀏覽器同時處理 urls.txt
+CONCURRENCY = 1              # 1 = 原本的單一瀏覽器依序爬取
+HEADLESS_WORKERS = True      # 複製登入狀態的 worker 瀏覽器不需要顯示視窗
 
 
 # =====================================================
 # Selenium 初始化
 # =====================================================
 def init_driver():
-    chrome_options = Options()
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    return webdriver.Chrome(options=chrome_options)
+    return make_driver(headless=HEADLESS)
 
 
 # =====================================================
@@ -110,26 +117,57 @@ def get_post_text(driver):
 
 
 # =====================================================
-# 取得所有可能含留言文字的大區塊
+# 取得所有留言區塊的文字
 # =====================================================
-def get_comment_blocks(driver):
-    selectors = [
-        "div[role='article']",
-        "div[data-pressable-container='true']",
-        "ul li",
-        "div.x1lliihq",
-        "div[dir='auto']",
-    ]
-    blocks = []
-    for sel in selectors:
-        for e in driver.find_elements(By.CSS_SELECTOR, sel):
-            if e not in blocks:
-                blocks.append(e)
-    return blocks
+COMMENT_BLOCK_SELECTORS = [
+    "div[role='article']",
+    "div[data-pressable-container='true']",
+    "ul li",
+    "div.x1lliihq",
+    "div[dir='auto']",
+]
+DATE_PATTERN = r"\d{4}-\d{2}-\d{2}"
+
+# 在頁面內一次完成：選取、去重複、只保留最內層的留言區塊、取出文字
+# - querySelectorAll 對合併後的 selector 本身就依文件順序且不重複
+# - 只考慮含有日期的區塊；若某區塊內還有其他「日期後面有內容」的區塊，代表它包住了多則留言，捨棄
+#   (只有作者與日期的標題列不算，否則真正的留言容器會因為包住標題列而被捨棄)
+# - 「日期後面有內容」與 parse_post 的判斷相同：去掉尾巴的數字後仍有文字
+# - 每個祖先節點只會被標記一次，整體為線性時間
+_COMMENT_BLOCKS_JS = """
+var nodes = document.querySelectorAll(arguments[0]);
+var datePattern = new RegExp(arguments[1]);
+var candidates = [];
+for (var i = 0; i < nodes.length; i++) {
+    var text = nodes[i].innerText;
+    var m = text ? datePattern.exec(text) : null;
+    if (!m) continue;
+    var after = text.slice(m.index + m[0].length).trim().replace(/(?:\\s+[0-9,]+)+\\s*$/, '').trim();
+    candidates.push([nodes[i], text, after.length > 0]);
+}
+var hasInner = new Set();
+for (var i = 0; i < candidates.length; i++) {
+    if (!candidates[i][2]) continue;
+    var p = candidates[i][0].parentElement;
+    while (p && !hasInner.has(p)) {
+        hasInner.add(p);
+        p = p.parentElement;
+    }
+}
+var texts = [];
+for (var i = 0; i < candidates.length; i++) {
+    if (!hasInner.has(candidates[i][0])) texts.push(candidates[i][1].trim());
+}
+return texts;
+"""
+
+
+def get_comment_block_texts(driver):
+    return driver.execute_script(_COMMENT_BLOCKS_JS, ", ".join(COMMENT_BLOCK_SELECTORS), DATE_PATTERN)
 
 
 # =====================================================
-# 解析單一 Threads 貼文：貼文主文 + 所有留言
+# 爬取單一 Threads 貼文：載入、展開、捲到底後再解析
 # =====================================================
 def scrape_post(driver, url: str):
     print(f"\n開始爬取：{url}")
@@ -139,23 +177,28 @@ def scrape_post(driver, url: str):
     auto_expand(driver)
     scroll_to_bottom(driver)
     auto_expand(driver)
+    save_snapshot(driver, "threads", url.rstrip("/").split("/")[-1])
+
+    return parse_post(driver, url)
+
 
+# =====================================================
+# 解析已載入完成的貼文頁：貼文主文 + 所有留言
+# （不做任何導覽或等待，離線重播快照時也直接呼叫這裡）
+# =====================================================
+def parse_post(driver, url: str):
     # ---------- 貼文主文 ----------
     post_text = get_post_text(driver)
 
     # ---------- 抓留言 ----------
-    date_pat = re.compile(r"\d{4}-\d{2}-\d{2}")
-    blocks = get_comment_blocks(driver)
+    date_pat = re.compile(DATE_PATTERN)
+    block_texts = get_comment_block_texts(driver)
     comments = []
 
     # 若之後需要 fallback，用來候補當作貼文主文
     fallback_post_text = ""
 
-    for blk in blocks:
-        try:
-            raw = blk.text.strip()
-        except Exception:
-            raw = ""
+    for raw in block_texts:
         if not raw:
             continue
 
@@ -209,29 +252,67 @@ def scrape_post(driver, url: str):
 
 
 # =====================================================
-# 依「貼文主文」決定這篇貼文要分給哪些藝人
-# （一篇可以分給多個藝人）
+# 複製登入狀態：把主視窗的 cookies 加到新的瀏覽器
 # =====================================================
-def classify_posts_by_artist(posts, artist_keywords):
-    result = {artist: [] for artist in artist_keywords.keys()}
+def clone_session(cookies, headless=HEADLESS_WORKERS):
+    driver = make_driver(headless=headless)
+    domains = sorted({c["domain"].lstrip(".") for c in cookies})
+    for domain in domains:
+        # 必須先進入該網域才能設定它的 cookie
+        driver.get(f"https://{domain}/")
+        for c in cookies:
+            if c["domain"].lstrip(".") != domain:
+                continue
+            try:
+                driver.add_cookie(c)
+            except Exception:
+                pass
+    return driver
 
-    for post in posts:
-        post_text = post["post_text"] or ""
-        comments = post["comments"]
 
-        for artist, keywords in artist_keywords.items():
-            # 貼文主文是否提到該藝人的任何一個關鍵字？
-            if any(k in post_text for k in keywords):
-                # 這篇貼文的所有留言都放進該藝人
-                result[artist].extend(comments)
-
-    return result
+# =====================================================
+# 平行爬取多篇貼文：共用同一組登入 cookies，最多 concurrency 個瀏覽器同時進行
+# 依 urls 的順序逐篇產生結果 (爬取失敗的貼文略過)
+# =====================================================
+def iter_posts_concurrently(urls, cookies, concurrency):
+    drivers = [clone_session(cookies) for _ in range(concurrency)]
+    pool = queue.Queue()
+    for d in drivers:
+        pool.put(d)
+
+    def task(url):
+        driver = pool.get()
+        try:
+            return scrape_post(driver, url)
+        except Exception as e:
+            print(f"爬取 {url} 時發生錯誤：{e}")
+            return None
+        finally:
+            pool.put(driver)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # executor.map 依輸入順序回傳結果
+            for data in executor.map(task, urls):
+                if data is not None:
+                    yield data
+    finally:
+        for d in drivers:
+            d.quit()
+
+
+def iter_posts_sequentially(driver, urls):
+    for url in urls:
+        try:
+            yield scrape_post(driver, url)
+        except Exception as e:
+            print(f"爬取 {url} 時發生錯誤：{e}")
 
 
 # =====================================================
 # 主程式
 # =====================================================
-def main():
+def main(concurrency=CONCURRENCY):
     # -------- 讀取 URL 清單 --------
     with open("urls.txt", "r", encoding="utf-8") as f:
         urls = [u.strip() for u in f if u.strip()]
@@ -252,37 +333,36 @@ def main():
     driver.get("https://www.threads.net/login")
     input("\n請在彈出的視窗登入 Threads，登入完成後回到這裡按 Enter 繼續...\n")
 
-    all_posts = []
-
-    for url in urls:
-        try:
-            data = scrape_post(driver, url)
-            all_posts.append(data)
-        except Exception as e:
-            print(f"爬取 {url} 時發生錯誤：{e}")
-
-    driver.quit()
-
-    # -------- 整理全部留言，輸出 all_comments.csv --------
-    all_comments = []
-    for post in all_posts:
-        all_comments.extend(post["comments"])
-
-    df_all = pd.DataFrame(all_comments)
-    all_comments_path = os.path.join("output", "all_comments.csv")
-    df_all.to_csv(all_comments_path, encoding="utf-8-sig", index=False)
-    print(f"\n已輸出：{all_comments_path}（共 {len(df_all)} 則留言）")
-
-    # -------- 依貼文主文分類到各藝人 --------
-    classified = classify_posts_by_artist(all_posts, artist_keywords)
-
-    for artist, rows in classified.items():
-        out_path = os.path.join("output", f"{artist}.csv")
-        pd.DataFrame(rows).to_csv(out_path, encoding="utf-8-sig", index=False)
-        print(f"已輸出：{out_path}（{len(rows)} 則留言）")
+    if concurrency > 1:
+        # 匯出登入後的 cookies，之後由多個 worker 瀏覽器共用
+        cookies = driver.get_cookies()
+        driver.quit()
+        print(f"以 {concurrency} 個瀏覽器平行爬取 {len(urls)} 篇貼文")
+        posts = iter_posts_concurrently(urls, cookies, concurrency)
+    else:
+        posts = iter_posts_sequentially(driver, urls)
+
+    # -------- 每篇貼文爬完就寫入 all_comments.csv，並依貼文主文分類到各藝人 --------
+    writer = StreamingArtistWriter("output", artist_keywords)
+    try:
+        for post in posts:
+            writer.write_post(post)
+    finally:
+        writer.close()
+        if concurrency <= 1:
+            driver.quit()
+
+    print(f"\n已輸出：{os.path.join('output', 'all_comments.csv')}（共 {writer.total} 則留言）")
+    for artist, count in writer.counts.items():
+        print(f"已輸出：{os.path.join('output', f'{artist}.csv')}（{count} 則留言）")
 
     print("\n=== 全部完成 ===")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Threads 貼文留言爬蟲")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="同時開啟的瀏覽器數量上限 (預設: %(default)s)")
+    args = parser.parse_args()
+
+    main(concurrency=args.concurrency)